@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Compare the masked-array copy of a column with the get_necessary_data_column()
+function for row-major (parsed) and column-major (memory-mapped) content.
+
+Usage: python -m benchmarks.bench_columns [rows] [columns]
+"""
+import sys
+from time import perf_counter
+import numpy as np
+from idgrms.data import get_necessary_data_column
+from benchmarks.synthetic import catalog_header
+from benchmarks.timing import measure_memory
+
+
+def masked_column(file_content, file_header, column_index):
+    """
+    The implementation of get_necessary_data_column() used before.
+    """
+    index = abs(column_index) - 1
+    column_data = np.ma.array([])
+    column_data = np.append(column_data, file_content[:, index:index+1])
+
+    return column_index, file_header[index], column_data
+
+
+def main(rows_number=10000000, columns_number=15):
+    header = np.array(catalog_header(columns_number))
+    content = np.random.default_rng(0).normal(
+        15.0, 2.0, (rows_number, columns_number))
+    print("{} rows x {} columns".format(rows_number, columns_number))
+
+    for layout in ("row-major", "column-major"):
+        if layout == "column-major":
+            content = np.asfortranarray(content)
+        for name, function in (("masked copy", masked_column),
+                               ("ndarray", get_necessary_data_column)):
+            seconds, peak, column = measure_memory(function, content, header,
+                                                   12)
+            x = column[-1]
+            start = perf_counter()
+            np.take(x, np.arange(0, rows_number, 7))
+            take = perf_counter() - start
+            print("{:12s} {:12s} {:8.3f} s {:8.1f} MB  take {:6.3f} s".format(
+                layout, name, seconds, peak, take))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
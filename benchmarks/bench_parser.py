@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Compare the block parser of idgrms.data with the np.genfromtxt() reader.
+
+Usage: python -m benchmarks.bench_parser [rows] [columns]
+"""
+import os
+import sys
+import tempfile
+from idgrms.data import _read_file, read_file
+from benchmarks.synthetic import write_catalog
+from benchmarks.timing import measure
+
+
+def main(rows_number=1000000, columns_number=15):
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "synthetic.db")
+        write_catalog(filename, rows_number, columns_number)
+        megabytes = os.path.getsize(filename) / 2**20
+
+        old_time, old_content = measure(_read_file, filename)
+        new_time, (numbers, new_content) = measure(read_file, filename)
+
+    assert (old_content == new_content).all()
+    assert (old_content[:, 0] == numbers).all()
+
+    print("{} rows x {} columns, {:.1f} MB".format(
+        rows_number, columns_number, megabytes))
+    for name, seconds in (("np.genfromtxt", old_time),
+                          ("block parser", new_time)):
+        print("{:15s} {:8.3f} s {:8.1f} MB/s".format(
+            name, seconds, megabytes / seconds))
+    print("speedup {:.1f}x".format(old_time / new_time))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Measure how long it takes to show a picked point on all windows.
+
+Synthetic mouse clicks are fired at every window in turn, with blitting
+switched on and off. The figures use the Agg backend, so the time covers
+drawing but not copying pixels to a screen.
+
+Usage: python -m benchmarks.bench_pick [rows] [picks]
+"""
+import os
+import sys
+import tempfile
+from time import perf_counter
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+from matplotlib import pyplot as plt
+from matplotlib.backend_bases import MouseEvent
+from idgrms import plotdgrms
+from benchmarks.synthetic import write_catalog
+
+
+COLUMNS = [[12, -10], [12, -4], [14, -6]]
+
+
+def open_windows(filename, columns_argument):
+    """
+    Open all windows without showing them and draw them once.
+    """
+    plt.close('all')
+    show, plt.show = plt.show, lambda: None
+    try:
+        plotdgrms.trigger_windows(filename, columns_argument, None, False)
+    finally:
+        plt.show = show
+    figures = tuple(plt.figure(number) for number in plt.get_fignums())
+    for figure in figures:
+        figure.canvas.draw()
+
+    return figures
+
+
+def fire_pick(figure, index):
+    """
+    Fire a synthetic mouse click at a point of a figure.
+    """
+    ax = figure.axes[0]
+    x, y = ax.transData.transform(
+        [ax.points_data[0][index], ax.points_data[1][index]])
+    mouse_event = MouseEvent('button_press_event', figure.canvas, x, y, 1)
+    figure.canvas.callbacks.process('button_press_event', mouse_event)
+
+
+def percentiles(times):
+    """
+    Return the 50th and the 99th percentile of times in milliseconds.
+    """
+    return tuple(np.percentile(np.array(times) * 1000.0, (50, 99)))
+
+
+def main(rows_number=200000, picks_number=50):
+    generator = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "synthetic.db")
+        write_catalog(filename, rows_number)
+        print("{} rows, {} windows, {} picks".format(
+            rows_number, len(COLUMNS), picks_number))
+
+        for blitting in (False, True):
+            plotdgrms.blitting = blitting
+            figures = open_windows(filename, COLUMNS)
+            times = []
+            for pick in range(picks_number):
+                figure = figures[pick % len(figures)]
+                start = perf_counter()
+                fire_pick(figure, generator.integers(rows_number))
+                plotdgrms.flush_redraws()
+                times.append(perf_counter() - start)
+            print("blitting {:5s} p50 {:8.2f} ms  p99 {:8.2f} ms".format(
+                str(blitting), *percentiles(times)))
+
+    plt.close('all')
+    plotdgrms.blitting = True
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Time each stage of the load, draw, pick and save pipeline.
+
+Synthetic catalogs of the given sizes are generated with two groups of
+points. Every stage is timed on the Agg backend and the results are
+written as JSON, so runs of different versions can be compared.
+
+Usage: python -m benchmarks.bench_pipeline [--rows N [N ...]]
+           [--columns N] [--picks N] [--output FILE]
+"""
+import os
+import sys
+import json
+import platform
+import tempfile
+from argparse import ArgumentParser
+from time import perf_counter
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+from matplotlib import pyplot as plt
+import idgrms
+from idgrms import cache, plotdgrms
+from idgrms.data import (Catalog, read_file_content, get_data,
+                         get_color_data, mark_points)
+from benchmarks.synthetic import write_catalog
+from benchmarks.bench_pick import fire_pick
+from benchmarks.timing import measure
+
+
+COLUMNS = [[12, -10], [12, -4], [14, -6]]
+GROUPS_COLORS = ("green", "blue")
+
+
+def write_groups(directory, rows_number, fraction=0.01, seed=0):
+    """
+    Write files with identifiers of random points, one for each color.
+    """
+    generator = np.random.default_rng(seed)
+    groups_argument = []
+
+    for color in GROUPS_COLORS:
+        filename = os.path.join(directory, color + ".num")
+        numbers = generator.choice(rows_number,
+                                   max(int(rows_number * fraction), 1),
+                                   replace=False) + 1
+        np.savetxt(filename, np.sort(numbers), fmt="%d")
+        groups_argument.append([filename, color])
+
+    return groups_argument
+
+
+def draw_windows(filename, catalog, data, columns_argument, groups_argument,
+                 colors):
+    """
+    Draw all diagrams for the first time and connect them.
+    """
+    figures = plotdgrms.get_figures(columns_argument, False, catalog)
+    plotdgrms.draw_all_figures(filename, figures, data, columns_argument,
+                               groups_argument, colored_data=colors)
+    for figure in figures:
+        figure.canvas.draw()
+    plotdgrms.connect_figures(filename, figures, catalog, data,
+                              columns_argument, groups_argument, False,
+                              colored_data=colors)
+
+    return figures
+
+
+def pick_times(figures, rows_number, picks_number, seed=0):
+    """
+    Return wall times of clicks at random points of all windows in turn.
+    """
+    generator = np.random.default_rng(seed)
+    times = []
+
+    for pick in range(picks_number):
+        start = perf_counter()
+        fire_pick(figures[pick % len(figures)],
+                  generator.integers(rows_number))
+        plotdgrms.flush_redraws()
+        times.append(perf_counter() - start)
+
+    return times
+
+
+def time_stages(filename, rows_number, columns_argument, groups_argument,
+                picks_number):
+    """
+    Time all stages of the pipeline for a single catalog.
+    """
+    stages = {}
+
+    if os.path.exists(cache.sidecar_filename(filename)):
+        os.remove(cache.sidecar_filename(filename))
+    stages["read_file_content"] = measure(read_file_content, filename)[0]
+    stages["read_file_content_sidecar"] = measure(read_file_content,
+                                                  filename)[0]
+
+    catalog = Catalog(filename)
+    stages["get_data"], data = measure(get_data, catalog, columns_argument)
+    stages["get_color_data"], colors = measure(
+        get_color_data, catalog, groups_argument, data)
+
+    plt.close('all')
+    stages["draw_all_figures"], figures = measure(
+        draw_windows, filename, catalog, data, columns_argument,
+        groups_argument, colors)
+
+    times = np.array(pick_times(figures, rows_number, picks_number)) * 1000.0
+    stages["pick_p50_ms"], stages["pick_p99_ms"] = np.percentile(times,
+                                                                (50, 99))
+
+    indexes = np.sort(np.random.default_rng(0).choice(
+        rows_number, max(rows_number // 10, 1), replace=False))
+    stages["mark_points"], marked_data = measure(mark_points, data, indexes)
+    stages["save_all_figures"] = measure(
+        plotdgrms.save_all_figures, filename, data, columns_argument,
+        groups_argument, marked_data, colors)[0]
+    plt.close('all')
+
+    return {key: float(value) for key, value in stages.items()}
+
+
+def environment():
+    """
+    Describe versions of the software used by a run.
+    """
+    return {"idgrms": idgrms.__version__, "numpy": np.__version__,
+            "matplotlib": matplotlib.__version__,
+            "python": platform.python_version(),
+            "machine": platform.machine(), "cpus": os.cpu_count()}
+
+
+def main(arguments=None):
+    argparser = ArgumentParser(
+        description="Time stages of the idgrms pipeline.")
+    argparser.add_argument('--rows', nargs='+', type=int,
+                           default=[10000, 100000, 1000000])
+    argparser.add_argument('--columns', type=int, default=15)
+    argparser.add_argument('--picks', type=int, default=20)
+    argparser.add_argument('--output', help="A JSON file, stdout by default.")
+    args = argparser.parse_args(arguments)
+    columns_argument = [columns for columns in COLUMNS
+                        if max(map(abs, columns)) < args.columns]
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        for rows_number in args.rows:
+            filename = os.path.join(directory,
+                                    "synthetic_{}.db".format(rows_number))
+            write_catalog(filename, rows_number, args.columns)
+            groups_argument = write_groups(directory, rows_number)
+            stages = time_stages(filename, rows_number, columns_argument,
+                                 groups_argument, args.picks)
+            results.append({"rows": rows_number, "columns": args.columns,
+                            "diagrams": len(columns_argument),
+                            "stages": stages})
+            print("{:>10d} rows done".format(rows_number), file=sys.stderr)
+
+    report = json.dumps({"environment": environment(), "results": results},
+                        indent=2)
+    if args.output:
+        with open(args.output, 'w') as file_descriptor:
+            file_descriptor.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Generate synthetic catalogs in the format of example_data/mags.db.
+
+"""
+import numpy as np
+
+
+MAGS_HEADER = (
+    'no', 'U', 'errU', 'B', 'errB', 'V', 'errV', 'I', 'errI',
+    'U-B', 'errU-B', 'B-V', 'errB-V', 'V-I', 'errV-I'
+)
+
+
+def catalog_header(columns_number):
+    """
+    Make labels of columns for a synthetic catalog.
+
+    Parameters
+    ----------
+    columns_number : int
+        A number of columns, the one with identifiers included.
+
+    Returns
+    -------
+    tuple
+        A tuple with labels. Labels of mags.db are used when possible.
+    """
+    if columns_number <= len(MAGS_HEADER):
+        return MAGS_HEADER[:columns_number]
+
+    return MAGS_HEADER + tuple(
+        "col" + str(i + 1) for i in range(len(MAGS_HEADER), columns_number))
+
+
+def write_catalog(filename, rows_number, columns_number=15, seed=0,
+                  chunk_size=100000):
+    """
+    Write a synthetic catalog to a file.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the output file.
+    rows_number : int
+        A number of rows.
+    columns_number : int
+        A number of columns, the one with identifiers included.
+    seed : int
+        A seed of the random generator.
+    chunk_size : int
+        A number of rows generated and written at once.
+    """
+    generator = np.random.default_rng(seed)
+    row_format = ["%8d"] + ["%9.4f"] * (columns_number - 1)
+
+    with open(filename, 'w') as file_descriptor:
+        file_descriptor.write(
+            "# " + "  ".join(catalog_header(columns_number)) + "\n")
+        for first_row in range(0, rows_number, chunk_size):
+            rows = min(chunk_size, rows_number - first_row)
+            values = generator.normal(15.0, 2.0, (rows, columns_number))
+            values[:, 2::2] = np.abs(values[:, 2::2]) / 100.0
+            values[:, 0] = np.arange(first_row, first_row + rows) + 1
+            np.savetxt(file_descriptor, values, fmt=row_format)
@@ -0,0 +1,31 @@
+"""
+Measure calls of functions in benchmarks.
+
+"""
+import tracemalloc
+from time import perf_counter
+
+
+def measure(function, *args):
+    """
+    Return the wall time of a function call in seconds and its result.
+    """
+    start = perf_counter()
+    result = function(*args)
+
+    return perf_counter() - start, result
+
+
+def measure_memory(function, *args):
+    """
+    Return the wall time in seconds and the peak of memory allocated
+    in megabytes while a function is called, and its result.
+    """
+    tracemalloc.start()
+    try:
+        seconds, result = measure(function, *args)
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+    return seconds, peak, result
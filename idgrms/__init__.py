@@ -5,8 +5,11 @@ Idgrms
 Display points on many diagrams and interact with them.
 """
 
-__all__ = ["data", "plotdgrms"]
+__all__ = ["batch", "cache", "data", "instrument", "plotdgrms"]
 __version__ = '0.1.1'
 
+from . import cache
+from . import instrument
 from . import data
 from . import plotdgrms
+from . import batch
@@ -0,0 +1,126 @@
+"""
+Render diagrams of many data files to images without displaying windows.
+
+"""
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib import pyplot as plt
+from idgrms import plotdgrms
+from idgrms.data import (open_catalog, get_data, get_color_data,
+                         get_specific_data)
+
+
+def use_agg():
+    """
+    Switch pyplot of the current process to the non-interactive Agg backend.
+    """
+    plt.switch_backend('Agg')
+
+
+def render_file(filename, columns_argument, groups_argument=None,
+                image_format='png', dpi=None, where=None):
+    """
+    Render all diagrams of a data file to images.
+
+    The data file is parsed once for all diagrams. The images are named
+    like the first snapshot made in a window.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file which contains columns with integers and floats
+        separated by spaces. The first column should contain integers, the
+        rest of them - floats.
+    columns_argument : list
+        A nested list which contains sublists. Each sublist is made of
+        two integers. The numbers are indexes of columns to be used.
+    groups_argument : list
+        A list which contains sublists. Each sublist is made of two
+        strings. The first one points the name of another file with
+        integers. The second is a color name.
+    image_format : str
+        The extension of images, e.g. 'png', 'pdf' or 'svg'.
+    dpi : int
+        The resolution of rasterized layers in vector formats. By default
+        it's plotdgrms.raster_dpi.
+    where : str
+        If given, only rows which meet this condition are rendered. See
+        the idgrms.data.parse_where() function.
+
+    Returns
+    -------
+    tuple
+        Names of the saved images.
+    """
+    catalog = open_catalog(filename, columns_argument, where=where)
+    data = get_data(catalog, columns_argument)
+    colors = ()
+
+    if groups_argument:
+        colors = get_color_data(catalog, groups_argument, data)
+
+    # Numbering of snapshots made in windows is kept.
+    snapshots_number = plotdgrms.image_number
+    plotdgrms.image_number = 0
+    try:
+        plotdgrms.save_all_figures(filename, data, columns_argument,
+                                   groups_argument, colored_data=colors,
+                                   image_format=image_format, dpi=dpi)
+        return tuple(plotdgrms.saved_filename(
+            filename, get_specific_data(data, columns)[1], image_format)
+            for columns in columns_argument)
+    finally:
+        plotdgrms.image_number = snapshots_number
+
+
+def render_files(filenames, columns_argument, groups_argument=None,
+                 workers=None, image_format='png', dpi=None, where=None):
+    """
+    Render all diagrams of many data files to images in parallel.
+
+    Each data file is rendered by a single process of a pool, which uses
+    the Agg backend. A data file which can't be rendered is reported and
+    skipped.
+
+    Parameters
+    ----------
+    filenames : list
+        Names of data files. Repeated names are rendered once.
+    columns_argument : list
+        A nested list which contains sublists. Each sublist is made of
+        two integers. The numbers are indexes of columns to be used.
+    groups_argument : list
+        A list which contains sublists. Each sublist is made of two
+        strings. The first one points the name of another file with
+        integers. The second is a color name.
+    workers : int
+        The number of processes. By default it's the number of CPUs.
+    image_format : str
+        The extension of images, e.g. 'png', 'pdf' or 'svg'.
+    dpi : int
+        The resolution of rasterized layers in vector formats.
+    where : str
+        If given, only rows which meet this condition are rendered.
+
+    Returns
+    -------
+    tuple
+        A tuple made of two tuples: names of the saved images and names
+        of data files which failed.
+    """
+    filenames = tuple(dict.fromkeys(filenames))
+    images = ()
+    failed = ()
+
+    with ProcessPoolExecutor(workers, initializer=use_agg) as executor:
+        futures = [executor.submit(render_file, filename, columns_argument,
+                                   groups_argument, image_format, dpi, where)
+                   for filename in filenames]
+        for filename, future in zip(filenames, futures):
+            try:
+                images += future.result()
+            except (Exception, SystemExit) as error:
+                print("File {} can't be rendered: {!r}".format(filename,
+                                                               error))
+                failed += filename,
+
+    return images, failed
@@ -0,0 +1,228 @@
+"""
+Store parsed data files in binary sidecars to read them again quickly.
+
+A sidecar lies next to the data file and has the same name with the
+.idgrms suffix. It begins with a magic string and the length of a JSON
+metadata block, then the metadata itself. Raw arrays follow, aligned to
+64 bytes: the identifiers (int64) and the content (float64, column-major).
+The arrays are memory-mapped, so each column is a contiguous view and only
+the columns which are used are paged in.
+
+"""
+import os
+import json
+import hashlib
+import numpy as np
+
+
+SIDECAR_SUFFIX = ".idgrms"
+MAGIC = b"IDGRMS\x00\x02"
+ALIGNMENT = 64
+HASH_BLOCK_SIZE = 1 << 24
+use_sidecars = os.environ.get("IDGRMS_SIDECAR", "1") != "0"
+
+
+def sidecar_filename(filename):
+    """
+    Make the name of a sidecar.
+
+    Parameters
+    ----------
+    filename : str
+        The name of a data file.
+
+    Returns
+    -------
+    str
+        The name of the sidecar which belongs to the data file.
+    """
+    return filename + SIDECAR_SUFFIX
+
+
+def content_hash(filename):
+    """
+    Compute a hash of a file content.
+
+    Parameters
+    ----------
+    filename : str
+        The name of a file.
+
+    Returns
+    -------
+    str
+        A hexadecimal SHA-1 digest.
+    """
+    digest = hashlib.sha1()
+
+    with open(filename, 'rb') as file_descriptor:
+        for block in iter(lambda: file_descriptor.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def file_stamp(filename):
+    """
+    Describe a state of a file.
+
+    Parameters
+    ----------
+    filename : str
+        The name of a file.
+
+    Returns
+    -------
+    dict
+        A dictionary with the size, the modification time in nanoseconds
+        and the content hash of the file.
+    """
+    status = os.stat(filename)
+
+    return {"size": status.st_size, "mtime_ns": _mtime(status),
+            "hash": content_hash(filename)}
+
+
+def _mtime(status):
+    # A fixed width keeps the length of the metadata when it's updated.
+    return "{:020d}".format(status.st_mtime_ns)
+
+
+def _aligned(position):
+    return -(-position // ALIGNMENT) * ALIGNMENT
+
+
+def _read_metadata(file_descriptor):
+    if file_descriptor.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a sidecar")
+    length = int.from_bytes(file_descriptor.read(8), "little")
+    metadata = json.loads(file_descriptor.read(length).decode("utf-8"))
+
+    return metadata, len(MAGIC) + 8
+
+
+def _is_fresh(filename, sidecar, metadata, metadata_offset):
+    status = os.stat(filename)
+
+    if status.st_size != metadata["size"]:
+        return False
+    if _mtime(status) == metadata["mtime_ns"]:
+        return True
+    if content_hash(filename) != metadata["hash"]:
+        return False
+
+    # The file was touched or copied but its content didn't change.
+    metadata["mtime_ns"] = _mtime(status)
+    try:
+        with open(sidecar, 'r+b') as file_descriptor:
+            file_descriptor.seek(metadata_offset)
+            file_descriptor.write(json.dumps(metadata).encode("utf-8"))
+    except OSError:
+        pass
+
+    return True
+
+
+def read_sidecar(filename, header_only=False):
+    """
+    Read a parsed data file from its sidecar.
+
+    Parameters
+    ----------
+    filename : str
+        The name of a data file.
+    header_only : bool
+        If True, skip reading the arrays.
+
+    Returns
+    -------
+    tuple or None
+        A tuple made of the header, the identifiers and the content of the
+        data file. The last two are read-only memmaps, the content is stored
+        in the column-major order. They are None if header_only is True.
+        None is returned if the sidecar doesn't exist or is stale.
+    """
+    sidecar = sidecar_filename(filename)
+
+    if not use_sidecars or not os.path.exists(sidecar):
+        return None
+
+    try:
+        with open(sidecar, 'rb') as file_descriptor:
+            metadata, metadata_offset = _read_metadata(file_descriptor)
+            if not _is_fresh(filename, sidecar, metadata, metadata_offset):
+                return None
+            header = np.array(metadata["header"])
+            if header_only:
+                return header, None, None
+
+            rows, columns = metadata["rows"], metadata["columns"]
+            if rows == 0:
+                return header, np.empty(0, np.int64), np.empty((0, columns))
+            numbers = np.memmap(file_descriptor, np.int64, 'r',
+                                metadata["numbers_offset"], (rows,))
+            content = np.memmap(file_descriptor, np.float64, 'r',
+                                metadata["content_offset"], (rows, columns),
+                                order='F')
+    except (OSError, ValueError, KeyError):
+        return None
+
+    return header, numbers, content
+
+
+def write_sidecar(filename, stamp, header, numbers, content):
+    """
+    Write a parsed data file to its sidecar.
+
+    Parameters
+    ----------
+    filename : str
+        The name of a data file.
+    stamp : dict
+        A value returned by the file_stamp() function before the data file
+        was parsed. Nothing is written if the file has changed since then.
+    header : ndarray
+        A 1D array which elements are labels of each column.
+    numbers : ndarray
+        A 1D array which contains integers from the first column.
+    content : ndarray
+        A 2D array which elements are floats.
+    """
+    if not use_sidecars:
+        return
+
+    status = os.stat(filename)
+    if (status.st_size, _mtime(status)) != (stamp["size"], stamp["mtime_ns"]):
+        return
+
+    metadata = dict(stamp, header=[str(label) for label in header],
+                    rows=content.shape[0], columns=content.shape[1],
+                    numbers_offset=0, content_offset=0)
+    # The offsets depend on the metadata length, which depends on the offsets.
+    while True:
+        encoded = json.dumps(metadata).encode("utf-8")
+        numbers_offset = _aligned(len(MAGIC) + 8 + len(encoded))
+        content_offset = _aligned(numbers_offset + numbers.nbytes)
+        if (numbers_offset, content_offset) == (metadata["numbers_offset"],
+                                                metadata["content_offset"]):
+            break
+        metadata.update(numbers_offset=numbers_offset,
+                        content_offset=content_offset)
+
+    sidecar = sidecar_filename(filename)
+    temporary = sidecar + ".tmp"
+    try:
+        with open(temporary, 'wb') as file_descriptor:
+            file_descriptor.write(MAGIC)
+            file_descriptor.write(len(encoded).to_bytes(8, "little"))
+            file_descriptor.write(encoded)
+            file_descriptor.seek(metadata["numbers_offset"])
+            np.ascontiguousarray(numbers, np.int64).tofile(file_descriptor)
+            file_descriptor.seek(metadata["content_offset"])
+            for column in content.T:
+                np.ascontiguousarray(column, np.float64).tofile(
+                    file_descriptor)
+        os.replace(temporary, sidecar)
+    except OSError:
+        if os.path.exists(temporary):
+            os.remove(temporary)
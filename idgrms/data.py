@@ -2,7 +2,37 @@
 Read data from files, storage and cooperate with them.
 
 """
+import io
+import os
+import re
+import ast
+import mmap
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+from matplotlib.path import Path
+from idgrms import cache
+from idgrms.instrument import stage
+
+
+BLOCK_SIZE = 1 << 24
+GROUP_READERS = 8
+EXACT_INTEGERS_LIMIT = 2**53
+C_LOADTXT = np.lib.NumpyVersion(np.__version__) >= '1.23.0'
+WHERE_FUNCTIONS = {"abs": np.abs, "sqrt": np.sqrt, "log10": np.log10,
+                   "isfinite": np.isfinite, "isnan": np.isnan}
+WHERE_OPERATORS = {ast.Add: np.add, ast.Sub: np.subtract,
+                   ast.Mult: np.multiply, ast.Div: np.divide,
+                   ast.Pow: np.power, ast.Mod: np.mod,
+                   ast.BitAnd: np.logical_and, ast.BitOr: np.logical_or,
+                   ast.And: np.logical_and, ast.Or: np.logical_or,
+                   ast.USub: np.negative, ast.UAdd: np.positive,
+                   ast.Not: np.logical_not, ast.Invert: np.logical_not,
+                   ast.Lt: np.less, ast.LtE: np.less_equal,
+                   ast.Gt: np.greater, ast.GtE: np.greater_equal,
+                   ast.Eq: np.equal, ast.NotEq: np.not_equal}
+# Bitwise operators are accepted only between conditions.
+WHERE_LOGICAL_OPERATORS = (ast.BitAnd, ast.BitOr, ast.Invert)
 
 
 def _read_file(filename, max_lines_number=None,
@@ -19,6 +49,315 @@ def _read_file(filename, max_lines_number=None,
     return file_content
 
 
+def _strip_comments(block, comment_mark=b"#"):
+    lines = block.split(b"\n")
+
+    return b"\n".join(line.split(comment_mark, 1)[0] for line in lines)
+
+
+def _first_column_integers(block):
+    # Decode the first token of each line straight from the bytes. The values
+    # of this column are stored as floats too, but large IDs don't fit into
+    # the 53-bit mantissa of a float64.
+    chars = np.frombuffer(block, dtype=np.uint8)
+    blank = chars <= 32
+    token_starts = np.flatnonzero(~blank & np.r_[True, blank[:-1]])
+    blank_positions = np.r_[np.flatnonzero(blank), len(chars)]
+    newlines = np.flatnonzero(chars == 10)
+    line_starts = np.r_[0, newlines + 1]
+    line_ends = np.r_[newlines, len(chars)]
+
+    first_tokens = np.searchsorted(token_starts, line_starts)
+    has_token = first_tokens < len(token_starts)
+    begins = token_starts[first_tokens[has_token]]
+    begins = begins[begins < line_ends[has_token]]
+    ends = blank_positions[np.searchsorted(blank_positions, begins)]
+
+    negative = chars[begins] == ord("-")
+    begins = begins + negative
+    numbers = np.zeros(len(begins), dtype=np.int64)
+
+    for shift in range((ends - begins).max(initial=0)):
+        positions = begins + shift
+        active = positions < ends
+        digits = chars[positions[active]].astype(np.int64) - ord("0")
+        if ((digits < 0) | (digits > 9)).any():
+            raise ValueError("The first column doesn't contain integers")
+        numbers[active] = numbers[active] * 10 + digits
+
+    return np.where(negative, -numbers, numbers)
+
+
+def _tokenize(block, columns_number):
+    # Since numpy 1.23 loadtxt() is backed by a C tokenizer which is faster
+    # than fromstring() and handles comments itself.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        if C_LOADTXT:
+            return np.loadtxt(io.BytesIO(block), ndmin=2)
+
+        warnings.simplefilter("error", DeprecationWarning)
+        if b"#" in block:
+            block = _strip_comments(block)
+        if not block.strip():
+            # fromstring() gives [-1.0] for blanks only.
+            return np.empty((0, columns_number))
+        try:
+            values = np.fromstring(block, sep=" ")
+        except DeprecationWarning as warning:
+            raise ValueError(str(warning))
+
+    if values.size % columns_number:
+        raise ValueError("Rows have different numbers of columns")
+
+    return values.reshape(-1, columns_number)
+
+
+def _parse_block(block, columns_number):
+    values = _tokenize(block, columns_number)
+    if values.size == 0:
+        # Only blank and comment lines, which loadtxt() gives as 0 columns.
+        return np.empty((0, columns_number)), np.empty(0, dtype=np.int64)
+    if values.shape[1] != columns_number:
+        raise ValueError("Rows have different numbers of columns")
+    first_column = values[:, 0]
+
+    if (np.abs(first_column) < EXACT_INTEGERS_LIMIT).all():
+        numbers = first_column.astype(np.int64)
+        if (numbers == first_column).all():
+            return values, numbers
+
+    if b"#" in block:
+        block = _strip_comments(block)
+
+    return values, _first_column_integers(block)
+
+
+def _block_bounds(buffer, start=0, block_size=BLOCK_SIZE, stop=None):
+    stop = len(buffer) if stop is None else stop
+    while start < stop:
+        end = buffer.find(b"\n", start + block_size, stop) + 1 or stop
+        yield start, end
+        start = end
+
+
+def _columns_number(file_descriptor):
+    for line in file_descriptor:
+        tokens = line.split(b"#", 1)[0].split()
+        if tokens:
+            return len(tokens)
+
+    raise ValueError("File {} doesn't contain data".format(
+        file_descriptor.name))
+
+
+def _parse_file(filename, block_size=BLOCK_SIZE):
+    # Parse a data file in big blocks with the numpy's C tokenizer, filling
+    # arrays allocated once for the whole file.
+    try:
+        file_descriptor = open(filename, 'rb')
+    except FileNotFoundError:
+        print("File {} doesn't exist!".format(filename))
+        exit(1)
+
+    with file_descriptor:
+        header = file_descriptor.readline()
+        offset = len(header) if header.lstrip().startswith(b"#") else 0
+        columns_number = _columns_number(file_descriptor)
+
+        with mmap.mmap(file_descriptor.fileno(), 0,
+                       access=mmap.ACCESS_READ) as buffer:
+            bounds = tuple(_block_bounds(buffer, offset, block_size))
+            rows_bound = sum(buffer[start:end].count(b"\n") + 1
+                             for start, end in bounds)
+            numbers = np.empty(rows_bound, dtype=np.int64)
+            content = np.empty((rows_bound, columns_number))
+            rows = 0
+
+            for start, end in bounds:
+                values, block_numbers = _parse_block(buffer[start:end],
+                                                     columns_number)
+                if len(values) != len(block_numbers):
+                    raise ValueError("Rows have different numbers of columns")
+                numbers[rows:rows + len(values)] = block_numbers
+                content[rows:rows + len(values)] = values
+                rows += len(values)
+
+    return numbers[:rows], content[:rows]
+
+
+def _row_offsets(block):
+    # Find where lines with data begin, skipping blank and comment lines.
+    # Leading blanks are skipped line by line, since they're short.
+    chars = np.frombuffer(block, dtype=np.uint8)
+    newlines = np.flatnonzero(chars == 10)
+    line_starts = np.r_[0, newlines + 1]
+    line_ends = np.r_[newlines, len(chars)]
+    positions = line_starts.copy()
+    leading = positions < line_ends
+
+    while leading.any():
+        leading[leading] = chars[positions[leading]] <= 32
+        positions += leading
+        leading &= positions < line_ends
+
+    filled = positions < line_ends
+    filled[filled] = chars[positions[filled]] != ord("#")
+
+    return line_starts[filled].astype(np.int64)
+
+
+def read_file_columns(filename, column_indexes, data_type=np.float64,
+                      block_size=BLOCK_SIZE):
+    """
+    Read chosen columns of a file block by block.
+
+    Only one block of the file is parsed at once, so the whole content
+    is never stored in memory.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file which contains columns with integers and floats
+        separated by spaces. The first column should contain integers, the
+        rest of them - floats. The file must begin with a one-line header.
+    column_indexes : list
+        Indexes of columns to keep, counted from 1. Signs are ignored.
+    data_type : dtype
+        The type of kept values, e.g. np.float32 to save memory.
+    block_size : int
+        The approximate size of a block in bytes.
+
+    Returns
+    -------
+    tuple
+        A tuple made of a 1D array with integers from the first column,
+        a 2D array (column-major) with the kept columns in the order of
+        column_indexes, and a 1D array with byte offsets of rows
+        in the file.
+    """
+    positions = [abs(column_index) - 1 for column_index in column_indexes]
+
+    try:
+        file_descriptor = open(filename, 'rb')
+    except FileNotFoundError:
+        print("File {} doesn't exist!".format(filename))
+        exit(1)
+
+    with file_descriptor:
+        header = file_descriptor.readline()
+        offset = len(header) if header.lstrip().startswith(b"#") else 0
+        columns_number = _columns_number(file_descriptor)
+
+        with mmap.mmap(file_descriptor.fileno(), 0,
+                       access=mmap.ACCESS_READ) as buffer:
+            return _read_columns(buffer, offset, len(buffer), columns_number,
+                                 positions, data_type, block_size)
+
+
+def _read_columns(buffer, start, stop, columns_number, positions, data_type,
+                  block_size=BLOCK_SIZE):
+    # Parse bytes between start and stop of a buffer in blocks, keeping only
+    # columns at the given positions.
+    bounds = tuple(_block_bounds(buffer, start, block_size, stop))
+    rows_bound = sum(buffer[start:end].count(b"\n") + 1
+                     for start, end in bounds)
+    numbers = np.empty(rows_bound, dtype=np.int64)
+    content = np.empty((rows_bound, len(positions)), data_type, order='F')
+    offsets = np.empty(rows_bound, dtype=np.int64)
+    rows = 0
+
+    for start, end in bounds:
+        block = buffer[start:end]
+        values, block_numbers = _parse_block(block, columns_number)
+        block_offsets = _row_offsets(block)
+        if not len(values) == len(block_numbers) == len(block_offsets):
+            raise ValueError("Rows have different numbers of columns")
+        numbers[rows:rows + len(values)] = block_numbers
+        content[rows:rows + len(values)] = values[:, positions]
+        offsets[rows:rows + len(values)] = block_offsets + start
+        rows += len(values)
+
+    return numbers[:rows], content[:rows], offsets[:rows]
+
+
+def read_file_rows(filename, offsets, columns_number):
+    """
+    Read single rows of a file.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file which contains columns with integers and floats
+        separated by spaces.
+    offsets : ndarray
+        Byte offsets of rows in the file.
+    columns_number : int
+        The number of columns in the file.
+
+    Returns
+    -------
+    tuple
+        A tuple made of a 1D array with integers from the first column
+        and a 2D array with floats from all columns of the rows.
+    """
+    if len(offsets) == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, columns_number))
+
+    with open(filename, 'rb') as file_descriptor, \
+            mmap.mmap(file_descriptor.fileno(), 0,
+                      access=mmap.ACCESS_READ) as buffer:
+        lines = b"\n".join(buffer[offset:buffer.find(b"\n", offset) % (
+            len(buffer) + 1)] for offset in offsets)
+    values, numbers = _parse_block(lines, columns_number)
+
+    return numbers, values
+
+
+def read_file(filename):
+    """
+    Read the identifiers and the content of a file without a header.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file which contains columns with integers and floats
+        separated by spaces. The first column should contain integers, the
+        rest of them - floats. The file must begin with a one-line header.
+
+    Returns
+    -------
+    tuple
+        A tuple made of a 1D array with integers from the first column
+        and a 2D array which elements are floats (the first column included).
+        Both are memory-mapped from the sidecar (the second one in the
+        column-major order) unless sidecars are disabled.
+    """
+    cached = cache.read_sidecar(filename)
+    if cached is not None:
+        return cached[1:]
+
+    stamp = None
+    if cache.use_sidecars and os.path.isfile(filename):
+        stamp = cache.file_stamp(filename)
+
+    try:
+        numbers, file_content = _parse_file(filename)
+    except ValueError:
+        file_content = _read_file(filename)
+        numbers = file_content[:, 0].astype(np.int64)
+
+    if stamp is not None:
+        cache.write_sidecar(filename, stamp, read_file_header(filename),
+                            numbers, file_content)
+        # Release the parsed arrays in favour of the memory-mapped ones.
+        cached = cache.read_sidecar(filename)
+        if cached is not None:
+            return cached[1:]
+
+    return numbers, file_content
+
+
 def read_file_header(filename):
     """
     Read a one-line file header.
@@ -36,6 +375,10 @@ def read_file_header(filename):
     file_header : ndarray
         A 1D array which elements are labels of each column.
     """
+    cached = cache.read_sidecar(filename, header_only=True)
+    if cached is not None:
+        return cached[0]
+
     file_header = _read_file(filename, max_lines_number=1,
                              comment_mark="//", data_type=None)
 
@@ -58,7 +401,7 @@ def read_file_content(filename):
     file_content : ndarray
         A 2D array which elements are floats.
     """
-    file_content = _read_file(filename)
+    file_content = read_file(filename)[1]
 
     return file_content
 
@@ -77,11 +420,583 @@ def read_group_file(filename):
     file_content : tuple
         A tuple which contains integers.
     """
-    file_content = tuple(_read_file(filename, data_type=int))
+    file_content = tuple(read_group_numbers(filename).tolist())
 
     return file_content
 
 
+def read_group_numbers(filename):
+    """
+    Read integers from a file quickly.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file which contains one column with integers.
+
+    Returns
+    -------
+    ndarray
+        A 1D array which contains integers.
+    """
+    try:
+        with open(filename, 'rb') as file_descriptor:
+            file_content = file_descriptor.read()
+    except FileNotFoundError:
+        print("File {} doesn't exist!".format(filename))
+        exit(1)
+
+    if b"#" in file_content:
+        file_content = _strip_comments(file_content)
+
+    try:
+        return _first_column_integers(file_content)
+    except ValueError:
+        return np.atleast_1d(_read_file(filename, data_type=np.int64))
+
+
+class Catalog:
+    """
+    Store the header and the content of a data file read only once.
+
+    Only the header is read when a catalog is created. The content is read
+    (memory-mapped from the sidecar or parsed) when it's needed for the
+    first time, and single columns are cached when they're asked for.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file which contains columns with integers and floats
+        separated by spaces. The first column should contain integers, the
+        rest of them - floats. The file must begin with a one-line header.
+
+    Attributes
+    ----------
+    filename : str
+        The name of the file.
+    header : ndarray
+        A 1D array which elements are labels of each column.
+    content : ndarray
+        A 2D array which elements are floats.
+    numbers : ndarray
+        A 1D array which contains integers from the first column.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.header = read_file_header(filename)
+        self._numbers = None
+        self._content = None
+        self._columns = {}
+        self._id_index = None
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def load(self):
+        """
+        Read the content of the file now, if it hasn't been read yet.
+        """
+        self._load()
+
+    def _load(self):
+        if self._content is None:
+            with stage("read_file") as record:
+                self._numbers, self._content = read_file(self.filename)
+                record["rows"] = len(self._numbers)
+
+    @property
+    def numbers(self):
+        self._load()
+        return self._numbers
+
+    @property
+    def content(self):
+        self._load()
+        return self._content
+
+    def column(self, column_index):
+        """
+        Get a single column.
+
+        Parameters
+        ----------
+        column_index : int
+            Indicates which column to use. The sign is ignored.
+
+        Returns
+        -------
+        tuple
+            The same as the get_necessary_data_column() function returns.
+        """
+        if column_index not in self._columns:
+            self._columns[column_index] = get_necessary_data_column(
+                self.content, self.header, column_index)
+
+        return self._columns[column_index]
+
+    def id_index(self):
+        """
+        Get the index of integers from the first column.
+
+        Returns
+        -------
+        tuple
+            The same as the build_id_index() function returns. The index
+            is built once.
+        """
+        if self._id_index is None:
+            self._id_index = build_id_index(self.numbers)
+
+        return self._id_index
+
+    def rows(self, indexes):
+        """
+        Get selected rows only.
+
+        Parameters
+        ----------
+        indexes : ndarray
+            An array with indexes of rows.
+
+        Returns
+        -------
+        tuple
+            A tuple made of a 1D array with integers from the first column
+            and a 2D array with floats from all columns of the rows.
+        """
+        indexes = np.asarray(indexes, dtype=np.intp)
+
+        return (np.take(self.numbers, indexes),
+                np.take(self.content, indexes, axis=0))
+
+
+class StreamedCatalog(Catalog):
+    """
+    Store only chosen columns of a data file read block by block.
+
+    The file is streamed by the read_file_columns() function, so the whole
+    content is never held in memory and no sidecar is written. Byte offsets
+    of rows are kept to read whole rows again when they're needed.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file which contains columns with integers and floats
+        separated by spaces. The first column should contain integers, the
+        rest of them - floats. The file must begin with a one-line header.
+    column_indexes : list
+        Indexes of columns to keep, counted from 1. Signs are ignored.
+    data_type : dtype
+        The type of kept values, e.g. np.float32 to save memory.
+
+    Attributes
+    ----------
+    column_indexes : list
+        Sorted indexes of kept columns.
+    content : ndarray
+        A 2D array (column-major) with the kept columns only.
+    offsets : ndarray
+        A 1D array with byte offsets of rows in the file.
+    """
+
+    def __init__(self, filename, column_indexes, data_type=np.float64):
+        super().__init__(filename)
+        self.column_indexes = sorted(set(abs(column_index)
+                                         for column_index in column_indexes))
+        self.data_type = data_type
+        self._offsets = None
+
+    def _load(self):
+        if self._content is None:
+            with stage("read_file_columns") as record:
+                self._numbers, self._content, self._offsets = (
+                    read_file_columns(self.filename, self.column_indexes,
+                                      self.data_type))
+                record["rows"] = len(self._numbers)
+
+    @property
+    def offsets(self):
+        self._load()
+        return self._offsets
+
+    def column(self, column_index):
+        """
+        Get a single kept column.
+
+        Parameters
+        ----------
+        column_index : int
+            Indicates which column to use. The sign is ignored.
+
+        Returns
+        -------
+        tuple
+            The same as the get_necessary_data_column() function returns.
+            The data is a view of the content.
+        """
+        if column_index not in self._columns:
+            if abs(column_index) not in self.column_indexes:
+                raise ValueError("Column {} wasn't read".format(column_index))
+            position = self.column_indexes.index(abs(column_index))
+            self._columns[column_index] = (
+                column_index, self.header[abs(column_index) - 1],
+                self.content[:, position])
+
+        return self._columns[column_index]
+
+    def rows(self, indexes):
+        """
+        Get selected rows only. They're read from the file again.
+
+        Parameters
+        ----------
+        indexes : ndarray
+            An array with indexes of rows.
+
+        Returns
+        -------
+        tuple
+            A tuple made of a 1D array with integers from the first column
+            and a 2D array with floats from all columns of the rows.
+        """
+        offsets = np.take(self.offsets, np.asarray(indexes, dtype=np.intp))
+
+        return read_file_rows(self.filename, offsets, len(self.header))
+
+
+def _append_rows(storage, rows, values):
+    # Put values after the first rows of arrays with a spare capacity,
+    # which is doubled when it's used up. Returns the arrays, new ones if
+    # they've grown.
+    if rows + len(values[0]) > len(storage[0]):
+        capacity = max(2 * len(storage[0]), rows + len(values[0]))
+        grown = tuple(np.empty((capacity,) + array.shape[1:], array.dtype,
+                               order='F') for array in storage)
+        for new, old in zip(grown, storage):
+            new[:rows] = old[:rows]
+        storage = grown
+
+    for array, new_values in zip(storage, values):
+        array[rows:rows + len(new_values)] = new_values
+
+    return storage
+
+
+class TailedCatalog(StreamedCatalog):
+    """
+    Follow a data file to which rows are appended while it's shown.
+
+    The file is read like by StreamedCatalog, but only up to the end of
+    its last complete line. The extend() method parses bytes appended
+    since then. Kept arrays have a spare capacity which is doubled when
+    it's used up, so appending rows costs amortized constant time per row.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file which contains columns with integers and floats
+        separated by spaces. The first column should contain integers, the
+        rest of them - floats. The file must begin with a one-line header.
+    column_indexes : list
+        Indexes of columns to keep, counted from 1. Signs are ignored.
+    data_type : dtype
+        The type of kept values, e.g. np.float32 to save memory.
+
+    Attributes
+    ----------
+    end : int
+        The byte offset in the file after the last read line.
+    """
+
+    def __init__(self, filename, column_indexes, data_type=np.float64):
+        super().__init__(filename, column_indexes, data_type)
+        self.end = None
+        self._storage = None
+
+    def _load(self):
+        if self.end is None:
+            self._storage = (np.empty(0, dtype=np.int64),
+                             np.empty((0, len(self.column_indexes)),
+                                      self.data_type, order='F'),
+                             np.empty(0, dtype=np.int64))
+            self._numbers, self._content, self._offsets = self._storage
+            with open(self.filename, 'rb') as file_descriptor:
+                header = file_descriptor.readline()
+            self.end = len(header) if header.lstrip().startswith(b"#") else 0
+            with stage("read_file_columns") as record:
+                record["rows"] = self.extend()
+
+    def extend(self):
+        """
+        Read rows appended to the file since the last reading.
+
+        A line is read only once it's ended by a newline, since it can be
+        still written. Cached columns and the index of integers are
+        dropped if there are new rows.
+
+        Returns
+        -------
+        int
+            The number of new rows.
+        """
+        self._load()
+
+        with open(self.filename, 'rb') as file_descriptor:
+            if os.fstat(file_descriptor.fileno()).st_size <= self.end:
+                return 0
+            with mmap.mmap(file_descriptor.fileno(), 0,
+                           access=mmap.ACCESS_READ) as buffer:
+                stop = buffer.rfind(b"\n", self.end) + 1
+                if stop <= self.end:
+                    return 0
+                numbers, content, offsets = _read_columns(
+                    buffer, self.end, stop, len(self.header),
+                    [index - 1 for index in self.column_indexes],
+                    self.data_type)
+        self.end = stop
+        if len(numbers) == 0:
+            return 0
+
+        rows = len(self._numbers)
+        self._storage = _append_rows(self._storage, rows,
+                                     (numbers, content, offsets))
+        self._numbers, self._content, self._offsets = (
+            array[:rows + len(numbers)] for array in self._storage)
+        self._columns = {}
+        self._id_index = None
+
+        return len(numbers)
+
+
+class FilteredCatalog(Catalog):
+    """
+    Show only rows of another catalog which meet a condition.
+
+    The condition is evaluated once over whole columns, then single
+    columns are gathered for the chosen rows when they're asked for,
+    so the whole content is never copied. Like in TailedCatalog, indexes
+    and gathered columns have a spare capacity for appended rows.
+
+    Parameters
+    ----------
+    catalog : Catalog
+        A catalog with all rows. It must contain columns used by the
+        condition.
+    expression : str
+        A condition accepted by the parse_where() function.
+
+    Attributes
+    ----------
+    catalog : Catalog
+        The catalog with all rows.
+    indexes : ndarray
+        Indexes of chosen rows in the catalog with all rows.
+    """
+
+    def __init__(self, catalog, expression):
+        self.catalog = catalog
+        self.expression = expression
+        self.filename = catalog.filename
+        self.header = catalog.header
+        self._indexes = None
+        self._numbers = None
+        self._storage = None
+        self._columns = {}
+        self._columns_storage = {}
+        self._id_index = None
+
+    def _load(self):
+        if self._indexes is None:
+            numbers = self.catalog.numbers
+            with stage("evaluate_where") as record:
+                self._indexes = np.flatnonzero(evaluate_where(
+                    self.expression, self.catalog))
+                self._numbers = numbers[self._indexes]
+                self._storage = self._indexes, self._numbers
+                record["rows"] = len(self._indexes)
+
+    @property
+    def indexes(self):
+        self._load()
+        return self._indexes
+
+    @property
+    def content(self):
+        # Only for completeness, the pipeline uses single columns.
+        return self.catalog.content[self.indexes]
+
+    def column(self, column_index):
+        """
+        Get a single column for chosen rows.
+
+        Parameters
+        ----------
+        column_index : int
+            Indicates which column to use. The sign is ignored.
+
+        Returns
+        -------
+        tuple
+            The same as the get_necessary_data_column() function returns.
+        """
+        if column_index not in self._columns:
+            index, label, values = self.catalog.column(column_index)
+            self._columns_storage[column_index] = values[self.indexes],
+            self._columns[column_index] = (
+                index, label, self._columns_storage[column_index][0])
+
+        return self._columns[column_index]
+
+    def find_rows(self, indexes):
+        """
+        Find chosen rows among rows of the catalog with all rows.
+
+        Parameters
+        ----------
+        indexes : ndarray
+            An array with indexes of rows in the catalog with all rows.
+
+        Returns
+        -------
+        ndarray
+            Indexes of chosen rows, in the same order. Rows which don't
+            meet the condition are skipped.
+        """
+        indexes = np.asarray(indexes, dtype=np.intp)
+        positions = np.searchsorted(self.indexes, indexes)
+        found = positions < len(self.indexes)
+        found[found] = self.indexes[positions[found]] == indexes[found]
+
+        return positions[found]
+
+    def rows(self, indexes):
+        """
+        Get selected rows only.
+
+        Parameters
+        ----------
+        indexes : ndarray
+            An array with indexes of chosen rows.
+
+        Returns
+        -------
+        tuple
+            The same as the rows() method of the catalog with all rows
+            returns.
+        """
+        return self.catalog.rows(
+            self.indexes[np.asarray(indexes, dtype=np.intp)])
+
+    def extend(self):
+        """
+        Read rows appended to the file, if the catalog with all rows is
+        a TailedCatalog. The condition is evaluated for new rows only and
+        only new chosen rows are added to gathered columns.
+
+        Returns
+        -------
+        int
+            The number of new chosen rows.
+        """
+        known = len(self.catalog)
+        self._load()
+
+        if self.catalog.extend() == 0:
+            return 0
+
+        indexes = known + np.flatnonzero(
+            evaluate_where(self.expression, self.catalog, known))
+        if len(indexes) == 0:
+            return 0
+
+        rows = len(self._indexes)
+        self._storage = _append_rows(
+            self._storage, rows, (indexes, self.catalog.numbers[indexes]))
+        self._indexes, self._numbers = (array[:rows + len(indexes)]
+                                        for array in self._storage)
+        for column_index, (index, label, _) in self._columns.items():
+            self._columns_storage[column_index] = _append_rows(
+                self._columns_storage[column_index], rows,
+                (self.catalog.column(column_index)[-1][indexes],))
+            self._columns[column_index] = (
+                index, label,
+                self._columns_storage[column_index][0][:rows + len(indexes)])
+        self._id_index = None
+
+        return len(indexes)
+
+
+def open_catalog(filename, columns_argument, data_type=None, tail=False,
+                 where=None):
+    """
+    Create a catalog which suits options of the program.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file which contains columns with integers and floats
+        separated by spaces. The first column should contain integers, the
+        rest of them - floats. The file must begin with a one-line header.
+    columns_argument : list
+        A nested list which contains sublists. Each sublist is made of
+        two integers. The numbers are indexes of columns to be used.
+    data_type : str
+        None, 'float64' or 'float32'. If given, the file is streamed and
+        only the used columns are kept as values of this type.
+    tail : bool
+        If True, a TailedCatalog is made, so rows appended to the file
+        can be read.
+    where : str
+        A condition accepted by the parse_where() function. If given,
+        only rows which meet it are used.
+
+    Returns
+    -------
+    Catalog
+        A Catalog, StreamedCatalog or TailedCatalog object, wrapped by
+        a FilteredCatalog if a condition is given.
+    """
+    column_indexes = unique_columns_list(columns_argument)
+
+    if where is not None:
+        column_indexes += list(parse_where(
+            where, read_file_header(filename))[1].values())
+
+    if tail:
+        catalog = TailedCatalog(filename, column_indexes,
+                                data_type or 'float64')
+    elif data_type is not None:
+        catalog = StreamedCatalog(filename, column_indexes, data_type)
+    else:
+        catalog = Catalog(filename)
+
+    if where is not None:
+        catalog = FilteredCatalog(catalog, where)
+
+    return catalog
+
+
+def get_catalog(catalog):
+    """
+    Make sure that a Catalog object is used.
+
+    Parameters
+    ----------
+    catalog : Catalog or str
+        A Catalog object or the name of the file to read it from.
+
+    Returns
+    -------
+    Catalog
+        The catalog passed as the argument or a new one read from the file.
+    """
+    if isinstance(catalog, Catalog):
+        return catalog
+
+    return Catalog(catalog)
+
+
 def unique_columns_list(nested_lists):
     """
     Flatten the nested list (two levels) and leave unique elements.
@@ -117,25 +1032,27 @@ def get_necessary_data_column(file_content, file_header, column_index):
     -------
     tuple
         A tuple is made of the column index, the label of the column
-        and the column's data stored in the masked_array.
+        and the column's data stored in a contiguous ndarray. It's a view
+        of file_content if the column is contiguous there (column-major
+        content), otherwise a copy. Missing values are NaNs.
     """
     index = abs(column_index) - 1
-    column_data = np.ma.array([])
-    column_data = np.append(column_data, file_content[:, index:index+1])
+    column_data = np.ascontiguousarray(file_content[:, index])
 
     return column_index, file_header[index], column_data
 
 
-def get_data(filename, columns_argument):
+def get_data(catalog, columns_argument):
     """
     Get specific columns with data.
 
     Parameters
     ----------
-    filename : str
-        The name of the file which contains columns with integers and floats
-        separated by spaces. The first column should contain integers, the
-        rest of them - floats. The file must begin with a one-line header.
+    catalog : Catalog or str
+        A Catalog object or the name of the file which contains columns with
+        integers and floats separated by spaces. The first column should
+        contain integers, the rest of them - floats. The file must begin with
+        a one-line header.
     columns_argument : list
         A nested list which contains sublists. Each sublist is made of
         two integers. The numbers are indexes of columns to be used.
@@ -147,17 +1064,160 @@ def get_data(filename, columns_argument):
         the returned value by the get_necessary_data_column() function.
     """
     data = ()
-    file_header = read_file_header(filename)
-    file_content = read_file_content(filename)
+    catalog = get_catalog(catalog)
     unique_columns = unique_columns_list(columns_argument)
 
     for column_index in unique_columns:
-        data += (get_necessary_data_column(file_content, file_header,
-                                           column_index),)
+        data += (catalog.column(column_index),)
 
     return data
 
 
+def parse_where(expression, header):
+    """
+    Parse a condition which chooses rows of a data file.
+
+    The condition is a Python expression made of column labels, numbers,
+    arithmetic operators, comparisons, logical operators (and, or, not,
+    &, |, ~) and one-argument functions from WHERE_FUNCTIONS, e.g.
+    'errV < 0.02 and V < 18'. Like in Python, & and | bind tighter than
+    comparisons, so they're accepted only between conditions, e.g.
+    '(errV < 0.02) & (V < 18)'. Labels which aren't Python names are put
+    between backticks, e.g. '`B-V` > 0.5'. Anything else is rejected.
+
+    Parameters
+    ----------
+    expression : str
+        The condition.
+    header : ndarray
+        A 1D array with labels of columns.
+
+    Returns
+    -------
+    tuple
+        A tuple made of the parsed expression (ast.Expression) and
+        a dictionary which maps names in the expression to indexes of
+        columns, counted from 1.
+
+    Raises
+    ------
+    ValueError
+        If the expression is wrong or uses an unknown label.
+    """
+    labels = {}
+
+    def replace_label(match):
+        name = "_where_label_{}".format(len(labels))
+        labels[name] = match.group(1)
+        return name
+
+    try:
+        tree = ast.parse(re.sub(r"`([^`]*)`", replace_label,
+                                expression).strip(), mode='eval')
+    except SyntaxError as error:
+        raise ValueError("Wrong expression {!r}: {}".format(expression,
+                                                           error.msg))
+
+    header = list(header)
+    functions = set(id(node.func) for node in ast.walk(tree)
+                    if isinstance(node, ast.Call))
+    columns = {}
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and id(node) not in functions:
+            label = labels.get(node.id, node.id)
+            if label not in header:
+                raise ValueError("Column {} doesn't exist".format(label))
+            columns[node.id] = header.index(label) + 1
+
+    # A trial over dummy columns rejects wrong nodes and results early.
+    with np.errstate(all='ignore'):
+        trial = np.asarray(_evaluate_node(
+            tree.body, dict.fromkeys(columns, np.zeros(1))))
+    if trial.dtype != bool:
+        raise ValueError("Expression {!r} doesn't give True or False".format(
+            expression))
+
+    return tree, columns
+
+
+def _evaluate_node(node, values):
+    # Only whitelisted nodes are evaluated, each one over whole arrays.
+    if isinstance(node, ast.Constant) and type(node.value) is bool:
+        return node.value
+    # Numbers are floats like columns, e.g. 10**-2 isn't an int64 power.
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return float(node.value)
+    if isinstance(node, ast.Name) and node.id in values:
+        return values[node.id]
+    if (isinstance(node, (ast.UnaryOp, ast.BinOp))
+            and type(node.op) in WHERE_OPERATORS):
+        operands = [_evaluate_node(operand, values) for operand
+                    in ((node.operand,) if isinstance(node, ast.UnaryOp)
+                        else (node.left, node.right))]
+        if (isinstance(node.op, WHERE_LOGICAL_OPERATORS)
+                and any(np.asarray(operand).dtype != bool
+                        for operand in operands)):
+            raise ValueError("Operands of {!r} must be conditions".format(
+                ast.unparse(node)))
+        return WHERE_OPERATORS[type(node.op)](*operands)
+    if isinstance(node, ast.BoolOp):
+        result = _evaluate_node(node.values[0], values)
+        for value in node.values[1:]:
+            result = WHERE_OPERATORS[type(node.op)](
+                result, _evaluate_node(value, values))
+        return result
+    if (isinstance(node, ast.Compare)
+            and all(type(op) in WHERE_OPERATORS for op in node.ops)):
+        left = _evaluate_node(node.left, values)
+        result = True
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _evaluate_node(comparator, values)
+            result = np.logical_and(result,
+                                    WHERE_OPERATORS[type(op)](left, right))
+            left = right
+        return result
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+            and node.func.id in WHERE_FUNCTIONS and not node.keywords):
+        if len(node.args) != 1:
+            raise ValueError("Function {!r} takes one argument".format(
+                node.func.id))
+        return WHERE_FUNCTIONS[node.func.id](
+            _evaluate_node(node.args[0], values))
+
+    raise ValueError("Expression {!r} isn't allowed".format(
+        ast.unparse(node)))
+
+
+def evaluate_where(expression, catalog, start=0):
+    """
+    Evaluate a condition for rows of a catalog.
+
+    Parameters
+    ----------
+    expression : str
+        A condition accepted by the parse_where() function.
+    catalog : Catalog
+        A catalog which contains columns used by the condition.
+    start : int
+        The index of the first row to evaluate.
+
+    Returns
+    -------
+    ndarray
+        A 1D boolean array, True for rows which meet the condition.
+        Comparisons with NaN are False.
+    """
+    tree, columns = parse_where(expression, catalog.header)
+    values = {name: catalog.column(index)[-1][start:]
+              for name, index in columns.items()}
+
+    with np.errstate(all='ignore'):
+        mask = _evaluate_node(tree.body, values)
+
+    return np.broadcast_to(mask, (len(catalog) - start,))
+
+
 def list_iterator(list_argument):
     """
     Iterate over a number of list elements.
@@ -240,9 +1300,10 @@ def get_marked_points(data, marked_data, columns):
     data : tuple
         A value returned by the get_data() function.
     marked_data : tuple
-        A tuple which can contain subtuples or be empty. Each subtuple
-        represents a set of points coming from a data column. The column is
-        pointed by an index included in the columns variable.
+        A value returned by the mark_points() function. It can contain
+        ndarrays (or subtuples) or be empty. Each one represents a set of
+        points coming from a data column. The column is pointed by an index
+        included in the columns variable.
     columns : list
         A list which contains two indexes of used columns - columns argument.
 
@@ -253,7 +1314,7 @@ def get_marked_points(data, marked_data, columns):
         of points coming from a data column. The column is pointed by an index
         included in the columns variable.
     """
-    if marked_data != ():
+    if len(marked_data) != 0:
         first_index, second_index = current_data_indexes(data, columns)
         return marked_data[first_index], marked_data[second_index]
     else:
@@ -270,7 +1331,7 @@ def get_colored_points(data, colored_data, columns, groups_argument):
         A value returned by the get_data() function.
     colored_data : tuple
         A tuple which can contain subtuples or be empty. Each subtuple
-        contains masked_arrays with data only for colored points and a string
+        contains ndarrays with data only for colored points and a string
         which represents a color name.
     columns : list
         A list which contains two indexes of used columns - columns argument.
@@ -281,7 +1342,7 @@ def get_colored_points(data, colored_data, columns, groups_argument):
     Returns
     -------
     tuple
-        The same as colored_data but masks in the masked_arrays can be changed.
+        The same as colored_data but only with columns used by a diagram.
     """
     colored_points = ()
 
@@ -312,63 +1373,487 @@ def mark_points(data, marked_data_indexes):
     Returns
     -------
     tuple
-        A tuple with subtuples. Each subtuple contains points from data
-        and is related to one index.
+        A tuple with ndarrays, one for each data column. Each ndarray
+        contains values of the column for marked points, in the order
+        of indexes. The tuple is empty if there are no indexes.
     """
-    marked_data = ()
-
     if len(marked_data_indexes) == 0:
-        return marked_data
+        return ()
 
-    for single_data in data:
-        dat = single_data[-1]
-        marked_points = ()
-        for index in marked_data_indexes:
-            marked_points += (dat[index],)
-        marked_data += (marked_points,)
+    indexes = np.asarray(marked_data_indexes, dtype=np.intp)
 
-    return marked_data
+    return tuple(single_data[-1][indexes] for single_data in data)
 
 
-def feedback(all_data, marked_data_indexes):
+def feedback(catalog, marked_data_indexes):
     """
     Print information about marked point(s).
 
     Parameters
     ----------
-    all_data : ndarray
-        The whole data coming from the main input file without a header.
+    catalog : Catalog
+        The catalog made of the main input file. Only the marked rows
+        are read from it.
     marked_data_indexes : ndarray
         A list containing indexes of points from data variable. The indexes
         come from marked points.
     """
-    for object_index, index in enumerate(marked_data_indexes):
+    numbers, rows = catalog.rows(marked_data_indexes)
+
+    for object_index, (number, row) in enumerate(zip(numbers, rows)):
         print("# object {}".format(object_index + 1))
-        print(int(all_data[index][0]))
-        for parameter in all_data[index][1:]:
+        print(number)
+        for parameter in row[1:]:
             print(parameter)
 
 
+def points_density(x, y, x_range, y_range, bins):
+    """
+    Count points in rectangular bins.
+
+    Parameters
+    ----------
+    x : ndarray
+        X coordinates of points.
+    y : ndarray
+        Y coordinates of points.
+    x_range : tuple
+        Limits of bins along the X axis. The order doesn't matter.
+    y_range : tuple
+        Limits of bins along the Y axis. The order doesn't matter.
+    bins : tuple
+        Numbers of bins along the X and the Y axis.
+
+    Returns
+    -------
+    ndarray
+        A 2D array with counts of points. Rows go along the Y axis from
+        the lower limit. Points outside the limits or with NaN coordinates
+        are skipped, points on the upper limits are counted.
+    """
+    x_bins, y_bins = bins
+    keys = np.zeros(len(x), dtype=np.intp)
+    inside = np.ones(len(x), dtype=bool)
+
+    for coordinates, limits, bins_number, scale in (
+            (x, x_range, x_bins, 1), (y, y_range, y_bins, x_bins)):
+        lower, upper = min(limits), max(limits)
+        if upper <= lower:
+            lower, upper = lower - 0.5, upper + 0.5
+        values = np.asarray(coordinates)
+        # Points on the upper limit fall into the last bin, like in
+        # histogram2d().
+        positions = np.minimum(np.floor((values - lower)
+                                        * (bins_number / (upper - lower))),
+                               bins_number - 1)
+        inside &= (values >= lower) & (values <= upper)
+        keys += np.where(inside, positions, 0).astype(np.intp) * scale
+
+    counts = np.bincount(keys[inside], minlength=x_bins * y_bins)
+
+    return counts.reshape(y_bins, x_bins)
+
+
+def points_in_rectangle(x, y, x_range, y_range):
+    """
+    Find points inside a rectangle.
+
+    Parameters
+    ----------
+    x : ndarray
+        X coordinates of points.
+    y : ndarray
+        Y coordinates of points.
+    x_range : tuple
+        Limits of the rectangle along the X axis. The order doesn't matter.
+    y_range : tuple
+        Limits of the rectangle along the Y axis. The order doesn't matter.
+
+    Returns
+    -------
+    ndarray
+        Sorted indexes of points inside the rectangle or on its edges.
+        Points with NaN coordinates are skipped.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+
+    return np.flatnonzero((x >= min(x_range)) & (x <= max(x_range))
+                          & (y >= min(y_range)) & (y <= max(y_range)))
+
+
+def points_in_polygon(x, y, vertices):
+    """
+    Find points inside a polygon.
+
+    Only points inside the bounding box of the polygon are tested
+    with the matplotlib.path.Path.contains_points() method.
+
+    Parameters
+    ----------
+    x : ndarray
+        X coordinates of points.
+    y : ndarray
+        Y coordinates of points.
+    vertices : array_like
+        A sequence of (x, y) pairs. The polygon is closed implicitly.
+
+    Returns
+    -------
+    ndarray
+        Sorted indexes of points inside the polygon. It's empty if there
+        are less than three vertices.
+    """
+    vertices = np.asarray(vertices, dtype=float).reshape(-1, 2)
+
+    if len(vertices) < 3:
+        return np.empty(0, dtype=np.intp)
+
+    candidates = points_in_rectangle(x, y, (vertices[:, 0].min(),
+                                            vertices[:, 0].max()),
+                                     (vertices[:, 1].min(),
+                                      vertices[:, 1].max()))
+    inside = Path(vertices).contains_points(
+        np.column_stack((np.asarray(x)[candidates],
+                         np.asarray(y)[candidates])))
+
+    return candidates[inside]
+
+
+class ViewSampler:
+    """
+    Choose points of a diagram which are drawn for a view.
+
+    Points are sorted along both axes once, so points inside a view are
+    found with binary searches on the axis which gives fewer candidates.
+    If there are too many of them, a stratified sample is drawn instead:
+    the view is divided into cells and each non-empty cell keeps a share of
+    its points proportional to the sample size, but at least one point.
+    Points with the lowest random priorities are kept, so the same points
+    stay visible when the view changes a little.
+
+    Parameters
+    ----------
+    x : ndarray
+        X coordinates of points.
+    y : ndarray
+        Y coordinates of points.
+    seed : int
+        A seed of the random priorities.
+    """
+
+    def __init__(self, x, y, seed=0):
+        self.coordinates = (np.asarray(x, dtype=float),
+                            np.asarray(y, dtype=float))
+        self.orders = tuple(np.argsort(values, kind='mergesort')
+                            for values in self.coordinates)
+        self.sorted = tuple(values[order] for values, order
+                            in zip(self.coordinates, self.orders))
+        self.random = np.random.RandomState(seed)
+        self.priority = self.random.permutation(len(x))
+
+    def extend(self, x, y):
+        """
+        Add points appended to coordinates.
+
+        New points are sorted alone and merged into sorted points, which
+        is faster than sorting all of them again. Their random priorities
+        are spread over the range of all priorities.
+
+        Parameters
+        ----------
+        x : ndarray
+            X coordinates of all points. The first ones are already known.
+        y : ndarray
+            Y coordinates of all points.
+        """
+        known = len(self.priority)
+        self.coordinates = (np.asarray(x, dtype=float),
+                            np.asarray(y, dtype=float))
+        orders = ()
+        sorted_values = ()
+
+        for values, order, old_values in zip(self.coordinates, self.orders,
+                                             self.sorted):
+            new_order = known + np.argsort(values[known:], kind='mergesort')
+            new_values = values[new_order]
+            positions = np.searchsorted(old_values, new_values, 'right')
+            orders += np.insert(order, positions, new_order),
+            sorted_values += np.insert(old_values, positions, new_values),
+
+        self.orders = orders
+        self.sorted = sorted_values
+        self.priority = np.r_[self.priority, self.random.randint(
+            0, len(x), len(x) - known)]
+
+    def inside(self, x_range, y_range):
+        """
+        Find points inside a view.
+
+        Parameters
+        ----------
+        x_range : tuple
+            Limits of the view along the X axis. The order doesn't matter.
+        y_range : tuple
+            Limits of the view along the Y axis. The order doesn't matter.
+
+        Returns
+        -------
+        ndarray
+            Indexes of points inside the view.
+        """
+        ranges = (sorted(x_range), sorted(y_range))
+        bounds = [(np.searchsorted(values, limits[0], 'left'),
+                   np.searchsorted(values, limits[1], 'right'))
+                  for values, limits in zip(self.sorted, ranges)]
+        axis = int(bounds[1][1] - bounds[1][0] < bounds[0][1] - bounds[0][0])
+        other = 1 - axis
+
+        indexes = self.orders[axis][bounds[axis][0]:bounds[axis][1]]
+        values = self.coordinates[other][indexes]
+
+        return indexes[(values >= ranges[other][0])
+                       & (values <= ranges[other][1])]
+
+    def sample(self, x_range, y_range, limit, strata=64):
+        """
+        Choose points to draw for a view.
+
+        Parameters
+        ----------
+        x_range : tuple
+            Limits of the view along the X axis. The order doesn't matter.
+        y_range : tuple
+            Limits of the view along the Y axis. The order doesn't matter.
+        limit : int
+            The approximate maximal number of points.
+        strata : int
+            The number of cells along each axis.
+
+        Returns
+        -------
+        ndarray
+            Indexes of all points inside the view if there are no more than
+            limit of them, otherwise indexes of the stratified sample.
+        """
+        indexes = self.inside(x_range, y_range)
+
+        if len(indexes) <= limit:
+            return indexes
+
+        keys = np.zeros(len(indexes), dtype=np.intp)
+        for values, limits, scale in ((self.coordinates[0], x_range, 1),
+                                      (self.coordinates[1], y_range, strata)):
+            lower, upper = min(limits), max(limits)
+            cells = np.floor((values[indexes] - lower)
+                             * (strata / max(upper - lower, 1e-300)))
+            keys += np.clip(cells, 0, strata - 1).astype(np.intp) * scale
+
+        order = np.argsort(keys * len(self.priority)
+                           + self.priority[indexes])
+        sorted_keys = keys[order]
+        counts = np.bincount(keys, minlength=strata * strata)
+        quotas = np.maximum(np.round(counts * (limit / len(indexes))), 1)
+        ranks = np.arange(len(order)) - (np.cumsum(counts) - counts)[
+            sorted_keys]
+
+        return indexes[order[ranks < quotas[sorted_keys]]]
+
+
+class PointsGrid:
+    """
+    Find points near a position with a uniform grid of square cells.
+
+    Points are sorted by keys of cells, so points from a column of
+    neighbouring cells are found with a single binary search. Points with
+    NaN coordinates are skipped.
+
+    Parameters
+    ----------
+    x : ndarray
+        X coordinates of points.
+    y : ndarray
+        Y coordinates of points.
+    cell_size : float
+        The length of a cell side. It should be close to the radius
+        used to find points.
+    """
+
+    def __init__(self, x, y, cell_size):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.cell_size = float(cell_size)
+        self.indexes = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        self.x = x[self.indexes]
+        self.y = y[self.indexes]
+
+        cells_x, cells_y = self._cells(self.x, self.y)
+        self.origin = (cells_x.min(initial=0), cells_y.min(initial=0))
+        self.height = cells_y.max(initial=0) - self.origin[1] + 1
+        keys = self._keys(cells_x, cells_y)
+        order = np.argsort(keys, kind='mergesort')
+
+        self.keys = keys[order]
+        self.indexes = self.indexes[order]
+        self.x = self.x[order]
+        self.y = self.y[order]
+
+    def _cells(self, x, y):
+        return (np.floor(np.asarray(x) / self.cell_size).astype(np.int64),
+                np.floor(np.asarray(y) / self.cell_size).astype(np.int64))
+
+    def _keys(self, cells_x, cells_y):
+        return (cells_x - self.origin[0]) * self.height + (
+            cells_y - self.origin[1])
+
+    def near(self, x, y, radius):
+        """
+        Find points near a position.
+
+        Parameters
+        ----------
+        x : float
+            X coordinate of the position.
+        y : float
+            Y coordinate of the position.
+        radius : float
+            The maximal distance of points from the position.
+
+        Returns
+        -------
+        ndarray
+            Sorted indexes of points which are not farther than radius.
+        """
+        reach = int(np.ceil(radius / self.cell_size))
+        cell_x, cell_y = self._cells(x, y)
+        bottom = max(cell_y - reach, self.origin[1])
+        top = min(cell_y + reach, self.origin[1] + self.height - 1)
+        candidates = []
+
+        for column in range(cell_x - reach, cell_x + reach + 1):
+            if bottom > top:
+                break
+            first = np.searchsorted(self.keys, self._keys(column, bottom))
+            last = np.searchsorted(self.keys, self._keys(column, top),
+                                   'right')
+            candidates.append(np.arange(first, last))
+
+        candidates = np.concatenate(candidates or [np.empty(0, np.intp)])
+        distances = np.hypot(self.x[candidates] - x, self.y[candidates] - y)
+
+        return np.sort(self.indexes[candidates[distances <= radius]])
+
+
 # If the --grp option is switched on, use these functions.
-def get_points_numbers(filename):
+def get_points_numbers(catalog):
     """
     Get integers from the first column of a file.
 
     Parameters
     ----------
-    filename : str
-        The name of the file which contains columns with integers and floats
-        separated by spaces. The first column should contain integers, the
-        rest of them - floats. The file must begin with a one-line header.
+    catalog : Catalog or str
+        A Catalog object or the name of the file which contains columns with
+        integers and floats separated by spaces. The first column should
+        contain integers, the rest of them - floats. The file must begin with
+        a one-line header.
 
     Returns
     -------
     tuple
         A tuple which contains integers from the first column.
     """
-    file_content = read_file_content(filename)
+    return tuple(get_catalog(catalog).numbers.tolist())
+
+
+def build_id_index(points_numbers):
+    """
+    Build an index which finds positions of integers quickly.
+
+    Parameters
+    ----------
+    points_numbers : tuple or ndarray
+        Contains integers.
+
+    Returns
+    -------
+    tuple
+        A tuple made of points_numbers sorted and the positions of the sorted
+        integers in points_numbers. If an integer occurs many times, the
+        first position is used.
+    """
+    points_numbers = np.asarray(points_numbers, dtype=np.int64)
+    order = np.argsort(points_numbers, kind='mergesort')
+
+    return points_numbers[order], order
+
+
+def find_ids(id_index, numbers):
+    """
+    Find positions of integers with the index.
+
+    Parameters
+    ----------
+    id_index : tuple
+        A value returned by the build_id_index() function.
+    numbers : ndarray
+        Integers to find.
+
+    Returns
+    -------
+    ndarray
+        Positions of the integers in the indexed array. Integers which
+        don't exist there get -1.
+    """
+    sorted_numbers, order = id_index
+    numbers = np.asarray(numbers, dtype=np.int64)
 
-    return tuple(file_content[:, 0:1].flatten().astype(int))
+    if len(sorted_numbers) == 0:
+        return np.full(len(numbers), -1, dtype=np.intp)
+
+    positions = np.searchsorted(sorted_numbers, numbers)
+    positions = np.minimum(positions, len(sorted_numbers) - 1)
+    found = sorted_numbers[positions] == numbers
+
+    return np.where(found, order[positions], -1)
+
+
+def report_unknown_ids(filename, numbers, limit=10):
+    """
+    Print integers from a group file which don't exist in the data file.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file which contains column with integers.
+    numbers : ndarray
+        The unknown integers.
+    limit : int
+        The maximal number of integers to print.
+    """
+    listed = ", ".join(str(number) for number in numbers[:limit])
+    if len(numbers) > limit:
+        listed += ", ..."
+    print("{} ID(s) from file {} don't exist in the data file: {}".format(
+        len(numbers), filename, listed))
+
+
+def _group_indexes(id_index, filenames):
+    # Files are read concurrently, then all integers are found at once.
+    with ThreadPoolExecutor(min(GROUP_READERS, len(filenames) or 1)) as pool:
+        groups_numbers = list(pool.map(read_group_numbers, filenames))
+    lengths = [len(numbers) for numbers in groups_numbers]
+    positions = find_ids(id_index, np.concatenate(
+        groups_numbers or [np.empty(0, dtype=np.int64)]))
+    groups_indexes = ()
+
+    for filename, numbers, indexes in zip(
+            filenames, groups_numbers,
+            np.split(positions, np.cumsum(lengths)[:-1])):
+        if (indexes < 0).any():
+            report_unknown_ids(filename, numbers[indexes < 0])
+        groups_indexes += (indexes[indexes >= 0],)
+
+    return groups_indexes
 
 
 def get_single_group_data(points_numbers, filename, color_argument):
@@ -377,7 +1862,7 @@ def get_single_group_data(points_numbers, filename, color_argument):
 
     Parameters
     ----------
-    points_numbers : tuple
+    points_numbers : tuple or ndarray
         Contains integers.
     filename : str
         The name of the file which contains column with integers.
@@ -387,29 +1872,28 @@ def get_single_group_data(points_numbers, filename, color_argument):
     Returns
     -------
     tuple
-        A tuple which contains a tuple of points indexes and the color
-        name at the end.
+        A tuple which contains an array of points indexes and the color
+        name at the end. Integers which don't exist in points_numbers
+        are reported and skipped.
     """
-    indexes = ()
-    file_content = read_group_file(filename)
-
-    for number in file_content:
-        indexes += (points_numbers.index(number),)
+    id_index = build_id_index(points_numbers)
+    indexes = _group_indexes(id_index, [filename])[0]
 
     return (indexes, color_argument)
 
 
-def get_group_data(data_filename, group_arguments):
+def get_group_data(catalog, group_arguments):
     """
     Make a tuple which elements are returned values
     by the get_single_group_data() function.
 
     Parameters
     ----------
-    data_filename : str
-        The name of the file which contains columns with integers and floats
-        separated by spaces. The first column should contain integers, the
-        rest of them - floats. The file must begin with a one-line header.
+    catalog : Catalog or str
+        A Catalog object or the name of the file which contains columns with
+        integers and floats separated by spaces. The first column should
+        contain integers, the rest of them - floats. The file must begin with
+        a one-line header.
      group_arguments : list
         A list which contains sublists. Each sublist is made of two
         strings. The first one points the name of another file with
@@ -420,27 +1904,36 @@ def get_group_data(data_filename, group_arguments):
     tuple
         A tuple which contains subtuples. Each subtuple is made of
         the returned value by the get_single_group_data() function.
+        Integers from all files are found in one pass over the index
+        of the catalog. For a FilteredCatalog they are indexes of chosen
+        rows. Only integers missing from the data file are reported,
+        integers of rows which don't meet the condition are skipped.
     """
-    group_data = ()
-    points_numbers = get_points_numbers(data_filename)
+    catalog = get_catalog(catalog)
+    filenames = [group_argument[0] for group_argument in group_arguments]
 
-    for group_argument in group_arguments:
-        group_data += (get_single_group_data(points_numbers, *group_argument),)
+    if isinstance(catalog, FilteredCatalog):
+        groups_indexes = tuple(
+            catalog.find_rows(indexes) for indexes
+            in _group_indexes(catalog.catalog.id_index(), filenames))
+    else:
+        groups_indexes = _group_indexes(catalog.id_index(), filenames)
 
-    return group_data
+    return tuple((indexes, group_argument[1]) for indexes, group_argument
+                 in zip(groups_indexes, group_arguments))
 
 
-def get_color_data(data_filename, group_arguments, data):
+def get_color_data(catalog, group_arguments, data):
     """
     Mark specific points.
 
     Parameters
     ----------
-    data_filename : string
-        The name of the file which contains columns with integers and floats
-        separated by spaces. The file must begin with a one-line header.
-        The header should describe each column and begin with a single '#'
-        sign then a space and the rest of columns labels.
+    catalog : Catalog or str
+        A Catalog object or the name of the file which contains columns with
+        integers and floats separated by spaces. The file must begin with
+        a one-line header. The header should describe each column and begin
+        with a single '#' sign then a space and the rest of columns labels.
      group_arguments : list
         A list which contains another lists, each one with two elements, a file
         name and a string with a color name.
@@ -451,16 +1944,70 @@ def get_color_data(data_filename, group_arguments, data):
     -------
     tuple
         A tuple with subtuples. Each subtuple contains points from data
-        in masked_arrays and the color name.
+        in ndarrays and the color name.
     """
-    group_data = get_group_data(data_filename, group_arguments)
+    group_data = get_group_data(catalog, group_arguments)
     color_data = ()
 
-    for one_group_data in group_data:
+    if not group_data:
+        return color_data
+
+    indexes = np.concatenate([one_group_data[0] for one_group_data
+                              in group_data])
+    splits = np.cumsum([len(one_group_data[0]) for one_group_data
+                        in group_data])[:-1]
+    columns = [np.split(np.take(one_column_data[-1], indexes), splits)
+               for one_column_data in data]
+
+    for group_index, one_group_data in enumerate(group_data):
         group = ()
-        for one_column_data in data:
-            group += np.take(one_column_data[-1], one_group_data[0]),
+        for column in columns:
+            group += column[group_index],
         group += one_group_data[-1],
         color_data += group,
 
     return color_data
+
+
+def extend_color_data(color_data, groups_numbers, catalog, data, start):
+    """
+    Add rows appended to a catalog to points of groups.
+
+    Only integers of the appended rows are looked for, so neither group
+    files nor the whole catalog are read again.
+
+    Parameters
+    ----------
+    color_data : tuple
+        A value returned by the get_color_data() function for rows
+        before start.
+    groups_numbers : tuple
+        Sorted integers of each group, e.g. returned by the
+        read_group_numbers() function.
+    catalog : Catalog
+        A catalog with appended rows at the end.
+    data : tuple
+        A value returned by the get_data() function for all rows.
+    start : int
+        The index of the first appended row.
+
+    Returns
+    -------
+    tuple
+        The same as the get_color_data() function returns for all rows.
+    """
+    new_numbers = catalog.numbers[start:]
+    extended_data = ()
+
+    for group, numbers in zip(color_data, groups_numbers):
+        if len(numbers) == 0:
+            extended_data += group,
+            continue
+        positions = np.minimum(np.searchsorted(numbers, new_numbers),
+                               len(numbers) - 1)
+        indexes = start + np.flatnonzero(numbers[positions] == new_numbers)
+        extended_data += tuple(
+            np.concatenate((values, np.take(column[-1], indexes)))
+            for values, column in zip(group[:-1], data)) + (group[-1],),
+
+    return extended_data
@@ -0,0 +1,106 @@
+"""
+Measure wall time and peak memory of stages of the program on demand.
+
+Instrumentation is switched off by default. It's switched on by the
+IDGRMS_PROFILE environment variable or the enable() function. The value
+'1', '-' or 'stderr' prints a summary line for each stage to stderr, any
+other value is the name of a file to which stages are appended as
+JSON lines.
+
+"""
+import os
+import sys
+import json
+import tracemalloc
+from time import perf_counter
+from contextlib import contextmanager
+
+
+output = None
+_peaks = []
+_tracing = False
+
+
+def enable(target):
+    """
+    Switch instrumentation on or off.
+
+    Parameters
+    ----------
+    target : str or None
+        '1', '-' or 'stderr' to print summaries to stderr, the name
+        of a JSON-lines file, or None (also '' and '0') to switch
+        instrumentation off.
+    """
+    global output, _tracing
+
+    if target in (None, '', '0'):
+        output = None
+        if _tracing:
+            tracemalloc.stop()
+            _tracing = False
+        return
+
+    output = '-' if target in ('1', '-', 'stderr') else target
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _tracing = True
+
+
+def _fold_peak():
+    # Nested stages reset the peak, so it's passed to all open stages first.
+    peak = tracemalloc.get_traced_memory()[1]
+    _peaks[:] = [max(stage_peak, peak) for stage_peak in _peaks]
+    tracemalloc.reset_peak()
+
+
+def _write(record):
+    if output == '-':
+        fields = "".join(", {} {}".format(key, value)
+                         for key, value in record.items()
+                         if key not in ("stage", "seconds", "peak_mb"))
+        print("idgrms: {} {:.4f} s, peak {:.1f} MB{}".format(
+            record["stage"], record["seconds"], record["peak_mb"], fields),
+            file=sys.stderr)
+    else:
+        with open(output, 'a') as file_descriptor:
+            file_descriptor.write(json.dumps(record) + "\n")
+
+
+@contextmanager
+def stage(name):
+    """
+    Measure a stage of the program.
+
+    Parameters
+    ----------
+    name : str
+        The name of the stage.
+
+    Yields
+    ------
+    dict
+        A record of the stage. Other fields, e.g. the number of drawn
+        points, can be added to it before the stage ends. The wall time
+        in seconds and the peak of memory traced by tracemalloc in MB
+        are added at the end, then the record is written.
+    """
+    record = {"stage": name}
+
+    if output is None:
+        yield record
+        return
+
+    _fold_peak()
+    _peaks.append(0)
+    start = perf_counter()
+    try:
+        yield record
+    finally:
+        seconds = perf_counter() - start
+        _fold_peak()
+        record.update(seconds=seconds, peak_mb=_peaks.pop() / 2**20)
+        _write(record)
+
+
+enable(os.environ.get("IDGRMS_PROFILE"))
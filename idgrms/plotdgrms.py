@@ -3,19 +3,45 @@ This module is responsible for creating, drawing, displaying, saving
 and connecting all independent windows of interactive diagrams.
 
 """
-from numpy import array_equal
+from concurrent.futures import ThreadPoolExecutor, wait
+from numpy import (array_equal, asarray, ceil, column_stack, concatenate,
+                   empty, isfinite, linspace, ma, nanmax, nanmin, sort, sqrt)
 from matplotlib import pyplot as plt
-from matplotlib.widgets import Button
+from matplotlib.backend_bases import TimerBase
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import ListedColormap, LogNorm
+from matplotlib.figure import Figure
+from matplotlib.image import AxesImage
+from matplotlib.widgets import Button, LassoSelector, RectangleSelector
 from idgrms.data import (list_iterator, get_specific_data, get_marked_points,
                          get_colored_points, get_color_data, get_data,
-                         mark_points, read_file_content, feedback)
+                         extend_color_data, read_group_numbers,
+                         mark_points, feedback, open_catalog, PointsGrid,
+                         ViewSampler, points_density, points_in_polygon,
+                         points_in_rectangle)
+from idgrms.instrument import stage
 
 
 image_number = 0
-marked_data_indexes = None
+marked_data_indexes = empty(0, dtype=int)
+blitting = True
+redraw_interval = 16
+dirty_figures = []
+redraw_timer = None
+snapshot_executor = None
+snapshot_poll_interval = 100
+image_format = 'png'
+raster_dpi = 150
+vector_formats = ('pdf', 'svg', 'eps', 'ps')
+pick_radius = 6.5
+density_threshold = 200000
+lod_points = 50000
+selection_modes = ('Pick', 'Lasso', 'Box')
+density_bin_size = 2
+density_colormap = ListedColormap(plt.get_cmap('Greys')(linspace(0.3, 1, 256)))
 
 
-def get_figures(columns_argument, talk_argument, all_data):
+def get_figures(columns_argument, talk_argument, catalog, grid=False):
     """
     Generate a tuple with figures.
 
@@ -26,40 +52,84 @@ def get_figures(columns_argument, talk_argument, all_data):
         two integers. The numbers are indexes of columns to be used.
     talk_argument : bool
         This value is resposible for displaying the feedback button.
-    all_data : ndarray
-        An array which stores all information about data taken from
+    catalog : Catalog
+        An object which stores all information about data taken from
         an input file.
+    grid : bool
+        If True, all diagrams are panels of a single window.
 
     Returns
     -------
     tuple
-        A tuple which contains figures for all displayed windows. Each figure
-        is an object of matplotlib.figure.Figure class.
+        A tuple which contains figures for all diagrams. Each figure is
+        an object of matplotlib.figure.Figure class, i.e. a separate window,
+        or matplotlib.figure.SubFigure class, i.e. a panel of the window
+        made by the get_grid_figures() function.
     """
-    figures = ()
     global marked_data_indexes
 
-    for _ in list_iterator(columns_argument):
-        figure = plt.figure()
+    if grid:
+        figures = get_grid_figures(len(columns_argument))
+    else:
+        figures = ()
+        for _ in list_iterator(columns_argument):
+            figure = plt.figure()
+            figure.diagrams = figure,
+            figures += figure,
+
+    for figure in figures:
         axis = figure.add_subplot(111)
-        plt.subplots_adjust(bottom=0.15)
-        axis.save = plt.axes([0.125, 0.05, 0.15, 0.05])
+        figure.subplots_adjust(bottom=0.15)
+        axis.save = figure.add_axes([0.125, 0.05, 0.15, 0.05])
         axis.save_button = Button(axis.save, 'Snapshot')
+        axis.select = figure.add_axes([0.3, 0.05, 0.15, 0.05])
+        axis.select_button = Button(axis.select, selection_modes[0])
 
         if not talk_argument:
-            axis.info = plt.axes([0.75, 0.05, 0.15, 0.05])
+            axis.info = figure.add_axes([0.75, 0.05, 0.15, 0.05])
             axis.info_button = Button(axis.info, 'Feedback')
             axis.info_button.on_clicked(
-                lambda event: feedback(all_data, marked_data_indexes))
-
-        figures += figure,
+                lambda event: feedback(catalog, marked_data_indexes))
 
     return figures
 
 
+def get_grid_figures(diagrams_number):
+    """
+    Divide a single window into a grid of panels, one for each diagram.
+
+    All panels share the canvas of the window, so a change of the selection
+    is shown by a single draw of the canvas.
+
+    Parameters
+    ----------
+    diagrams_number : int
+        The number of diagrams.
+
+    Returns
+    -------
+    tuple
+        A tuple with panels, i.e. objects of matplotlib.figure.SubFigure
+        class. It's also stored as the diagrams attribute of the window.
+    """
+    columns = int(ceil(sqrt(diagrams_number)))
+    rows = int(ceil(diagrams_number / columns))
+    window = plt.figure(figsize=(5.0 * columns, 5.0 * rows))
+    panels = window.subfigures(rows, columns, squeeze=False)
+    window.diagrams = tuple(panels.flat[:diagrams_number])
+
+    # RectangleSelector asks the figure of its axis for the size in inches,
+    # which only the window knows. Positions of axes are relative to it.
+    for panel in window.diagrams:
+        panel.get_size_inches = window.get_size_inches
+
+    return window.diagrams
+
+
 def draw_all_figures(filename, figures, data, columns_argument,
                      groups_argument, marked_data=(), colored_data=(),
-                     save_images=False):
+                     save_images=False, density_argument='auto',
+                     image_format=None, dpi=None):
     """
     This function triggers displaying or saving to files all diagrams.
 
@@ -74,7 +144,7 @@ def draw_all_figures(filename, figures, data, columns_argument,
     data : tuple
         A nested tuple contains subtuples. Each subtuple is made of the column
         index, the label of the column and the column's data stored in the
-        masked_array.
+        ndarray.
     columns_argument : list
         A nested list which contains sublists. Each sublist is made of
         two integers. The numbers are indexes of columns to be used.
@@ -87,11 +157,23 @@ def draw_all_figures(filename, figures, data, columns_argument,
         represents a set of points coming from a data column.
     colored_data : tuple
         A tuple which can contain subtuples or be empty. Each subtuple
-        contains masked_arrays with data only for colored points and a string
+        contains ndarrays with data only for colored points and a string
         which represents a color name.
     save_images : bool
-        A switch between displaying windows and saving images to PNG files.
+        A switch between displaying windows and saving images to files.
+    density_argument : str
+        'on' or 'off' switches drawing the points as a density map.
+        'auto' uses the map if the number of points exceeds
+        density_threshold.
+    image_format : str
+        The extension of images, e.g. 'png', 'pdf' or 'svg'. By default
+        it's the image_format.
+    dpi : int
+        The resolution of rasterized layers in vector formats. By default
+        it's the raster_dpi.
     """
+    density = uses_density(density_argument, len(data[-1][-1]))
+
     for figure, columns in zip(figures, columns_argument):
         points, axes_labels, axes_orientation = (
             get_specific_data(data, columns))
@@ -105,9 +187,32 @@ def draw_all_figures(filename, figures, data, columns_argument,
 
         if save_images:
             save_diagram(filename, figure, points, axes_labels,
-                         marked_points, colored_points)
+                         marked_points, colored_points, image_format, dpi)
         else:
-            plot_diagram(figure, points, marked_points, colored_points)
+            plot_diagram(figure, points, marked_points, colored_points,
+                         density)
+
+
+def uses_density(density_argument, points_number):
+    """
+    Decide whether points are drawn as a density map.
+
+    Parameters
+    ----------
+    density_argument : str
+        'on', 'off' or 'auto'.
+    points_number : int
+        A number of points used to construct one diagram.
+
+    Returns
+    -------
+    bool
+        True if the density map should be drawn.
+    """
+    if density_argument == 'auto':
+        return points_number > density_threshold
+
+    return density_argument == 'on'
 
 
 def set_axes_labels(figure, axes_labels, points_number):
@@ -149,16 +254,20 @@ def set_axes_orientation(figure, axes_orientation):
         figure.axes[0].invert_yaxis()
 
 
-def plot_diagram(figure, points=(), marked_points=(), colored_points=()):
+def plot_diagram(figure, points=(), marked_points=(), colored_points=(),
+                 density=False):
     """
     Plot a single diagram.
 
+    The artists of the diagram are kept as attributes of the axis, so
+    later changes can update them without drawing everything again.
+
     Parameters
     ----------
     figure : matplotlib.figure.Figure
         A single figure.
     points : tuple
-        A tuple made of two masked_arrays. The arrays store x, y coordinates
+        A tuple made of two ndarrays. The arrays store x, y coordinates
         of each point which is plotted on a diagram.
     marked_points : tuple
         A tuple made of two subtuples. Each subtuple stores x, y coordinates
@@ -166,24 +275,585 @@ def plot_diagram(figure, points=(), marked_points=(), colored_points=()):
     colored_points : tuple
         A tuple made of three subtuples. Each subtuple stores x, y coordinates
         and a string with color name, respectively. A single coordinate is
-        stored in a masked_array.
+        stored in an ndarray.
+    density : bool
+        If True, points are drawn as a density map instead of markers.
     """
     ax = figure.axes[0]
-    ax.scatter(points[0], points[1], 60, c='gray', alpha=0.4, zorder=1)
+    ax.points_sampler = None
+    if density:
+        ax.points_layer = plot_density(ax, points)
+    else:
+        ax.points_layer = plot_points(ax, points)
+    ax.colored_layers = ()
 
-    if marked_points != ():
-        ax.scatter(marked_points[0], marked_points[1], 100, c='red',
-                   alpha=1.0, zorder=3)
     if colored_points != ():
         for cp in colored_points:
-            ax.scatter(cp[0], cp[1], 60, c=cp[2], alpha=0.6, zorder=2)
+            ax.colored_layers += ax.scatter(cp[0], cp[1], 60, c=cp[2],
+                                            alpha=0.6, zorder=2),
+
+    ax.marked_layer = ax.scatter([], [], 100, c='red', alpha=1.0, zorder=3,
+                                 animated=uses_blitting(figure))
+    ax.marked_layer.set_offsets(points_offsets(marked_points))
+    ax.points_data = points
+    ax.points_grid = None
+
+
+def points_bounds(points):
+    """
+    Find the smallest rectangle which contains all points.
+
+    Parameters
+    ----------
+    points : tuple
+        A tuple made of two ndarrays with x, y coordinates of points.
+
+    Returns
+    -------
+    tuple
+        The limits (x_min, x_max, y_min, y_max). Points with NaN coordinates
+        are skipped. If there are no other points, a unit square is returned.
+    """
+    finite = isfinite(points[0]) & isfinite(points[1])
+
+    if not finite.any():
+        return (0.0, 1.0, 0.0, 1.0)
+
+    return (nanmin(points[0][finite]), nanmax(points[0][finite]),
+            nanmin(points[1][finite]), nanmax(points[1][finite]))
+
+
+def plot_points(ax, points):
+    """
+    Plot points of a diagram as markers.
+
+    If there are more than lod_points points, only a sample of them chosen
+    for the current view is drawn. The sample is chosen again whenever
+    the axis limits change, and all points inside the view are drawn once
+    there are few enough of them.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axis of a diagram.
+    points : tuple
+        A tuple made of two ndarrays with x, y coordinates of points.
+
+    Returns
+    -------
+    matplotlib.collections.PathCollection
+        The collection with markers.
+    """
+    if len(points[0]) <= lod_points:
+        return ax.scatter(points[0], points[1], 60, c='gray', alpha=0.4,
+                          zorder=1)
+
+    bounds = points_bounds(points)
+    ax.update_datalim([(bounds[0], bounds[2]), (bounds[1], bounds[3])])
+    ax.autoscale_view()
+
+    layer = ax.scatter([], [], 60, c='gray', alpha=0.4, zorder=1)
+    ax.points_sampler = ViewSampler(points[0], points[1])
+    update_points_sample(ax, layer, points)
+    ax.callbacks.connect('xlim_changed', lambda ax: update_points_sample(
+        ax, layer, ax.points_data))
+    ax.callbacks.connect('ylim_changed', lambda ax: update_points_sample(
+        ax, layer, ax.points_data))
+
+    return layer
+
+
+def update_points_sample(ax, layer, points):
+    """
+    Choose points drawn for the current limits of an axis again.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axis of a diagram.
+    layer : matplotlib.collections.PathCollection
+        The collection made by the plot_points() function.
+    points : tuple
+        A tuple made of two ndarrays with x, y coordinates of points.
+    """
+    indexes = ax.points_sampler.sample(ax.get_xlim(), ax.get_ylim(),
+                                       lod_points)
+    layer.set_offsets(column_stack((points[0][indexes],
+                                    points[1][indexes])))
+
+
+def plot_density(ax, points):
+    """
+    Plot points of a diagram as a density map.
+
+    The map is an image with counts of points in bins of density_bin_size
+    pixels. It covers the visible part of the diagram and is computed again
+    whenever the axis limits change.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axis of a diagram.
+    points : tuple
+        A tuple made of two ndarrays with x, y coordinates of points.
+
+    Returns
+    -------
+    matplotlib.image.AxesImage
+        The image of the density map.
+    """
+    bounds = points_bounds(points)
+
+    # Limits follow from the bounds like for a scatter, i.e. with margins
+    # and the orientation of axes kept.
+    autoscale = ax.get_autoscale_on()
+    ax.set_autoscale_on(False)
+    image = ax.imshow(ma.masked_all((1, 1)), cmap=density_colormap,
+                      norm=LogNorm(vmin=1, vmax=2), origin='lower',
+                      extent=bounds, aspect='auto', interpolation='nearest',
+                      zorder=1)
+    ax.set_autoscale_on(autoscale)
+    image.sticky_edges.x[:] = []
+    image.sticky_edges.y[:] = []
+    ax.autoscale_view()
+
+    image.density_points = points
+    image.density_bounds = bounds
+    update_density(ax, image)
+    ax.callbacks.connect('xlim_changed', lambda ax: update_density(ax, image))
+    ax.callbacks.connect('ylim_changed', lambda ax: update_density(ax, image))
+
+    return image
+
+
+def update_density(ax, image):
+    """
+    Compute a density map again for the current limits of an axis.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axis of a diagram.
+    image : matplotlib.image.AxesImage
+        The image of the density map made by the plot_density() function.
+    """
+    view = sorted(ax.get_xlim()) + sorted(ax.get_ylim())
+    bounds = image.density_bounds
+    extent = (max(view[0], bounds[0]), min(view[1], bounds[1]),
+              max(view[2], bounds[2]), min(view[3], bounds[3]))
+
+    if extent[0] >= extent[1] or extent[2] >= extent[3]:
+        image.set_visible(False)
+        return
+
+    bins = (max(int(ax.bbox.width * (extent[1] - extent[0])
+                    / (view[1] - view[0]) / density_bin_size), 1),
+            max(int(ax.bbox.height * (extent[3] - extent[2])
+                    / (view[3] - view[2]) / density_bin_size), 1))
+    counts = points_density(image.density_points[0], image.density_points[1],
+                            extent[:2], extent[2:], bins)
+    show_density(ax, image, counts, extent)
+
+
+def show_density(ax, image, counts, extent):
+    """
+    Show counts of points as the image of a density map.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axis of a diagram.
+    image : matplotlib.image.AxesImage
+        The image of the density map made by the plot_density() function.
+    counts : ndarray
+        A 2D array with counts of points in bins.
+    extent : tuple
+        Limits (x_min, x_max, y_min, y_max) of the bins. They must lie
+        within the density_bounds of the image.
+    """
+    image.set_data(ma.masked_equal(counts, 0))
+    image.set_clim(1, max(counts.max(), 2))
+    image.set_visible(True)
+    # The extent lies within the bounds, so the data limits don't grow.
+    autoscale = ax.get_autoscalex_on(), ax.get_autoscaley_on()
+    ax.set_autoscale_on(False)
+    image.set_extent(extent)
+    ax.set_autoscalex_on(autoscale[0])
+    ax.set_autoscaley_on(autoscale[1])
+    image.sticky_edges.x[:] = []
+    image.sticky_edges.y[:] = []
+
+
+def extend_all_figures(figures, data, columns_argument, groups_argument,
+                       colored_data, rows_number):
+    """
+    Show rows appended to data on all diagrams drawn before.
+
+    Parameters
+    ----------
+    figures : tuple
+        A tuple with figures drawn by the draw_all_figures() function.
+    data : tuple
+        A value returned by the get_data() function for all rows, including
+        the appended ones at the end.
+    columns_argument : list
+        A nested list which contains sublists. Each sublist is made of
+        two integers. The numbers are indexes of columns to be used.
+    groups_argument : list
+        A list which contains sublists. Each sublist is made of two
+        strings. The first one points the name of another file with
+        integers. The second is a color name.
+    colored_data : tuple
+        A value returned by the get_color_data() function for all rows.
+    rows_number : int
+        The number of appended rows.
+    """
+    for figure, columns in zip(figures, columns_argument):
+        points, axes_labels, _ = get_specific_data(data, columns)
+        colored_points = get_colored_points(data, colored_data, columns,
+                                            groups_argument)
+        extend_diagram(figure, points, colored_points, rows_number)
+        set_axes_labels(figure, axes_labels, len(data[-1][-1]))
+
+    for canvas in dict.fromkeys(figure.canvas for figure in figures):
+        canvas.draw_idle()
+
+
+def extend_diagram(figure, points, colored_points, rows_number):
+    """
+    Show points appended to a single diagram.
+
+    Only the new points are added to markers and to a density map, unless
+    its bounds grow. Limits of axes follow the points if they're
+    autoscaled, i.e. the diagram hasn't been zoomed.
+
+    Parameters
+    ----------
+    figure : matplotlib.figure.Figure
+        A figure drawn by the plot_diagram() function.
+    points : tuple
+        A tuple made of two ndarrays with x, y coordinates of all points.
+    colored_points : tuple
+        A value returned by the get_colored_points() function.
+    rows_number : int
+        The number of new points at the end of the arrays.
+    """
+    ax = figure.axes[0]
+    new_points = points[0][-rows_number:], points[1][-rows_number:]
+    ax.points_data = points
+    ax.points_grid = None
+
+    for layer, cp in zip(ax.colored_layers, colored_points):
+        layer.set_offsets(column_stack((cp[0], cp[1])))
+
+    if isinstance(ax.points_layer, AxesImage):
+        extend_density(ax, ax.points_layer, points, new_points)
+    else:
+        extend_points(ax, ax.points_layer, points, new_points)
+
+
+def extend_data_limits(ax, points):
+    """
+    Let data limits of an axis include points.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axis of a diagram.
+    points : tuple
+        A tuple made of two ndarrays with x, y coordinates of points.
+        Points with NaN coordinates are skipped.
+    """
+    finite = isfinite(points[0]) & isfinite(points[1])
+
+    if finite.any():
+        ax.update_datalim(column_stack((points[0][finite],
+                                        points[1][finite])))
+        ax.autoscale_view()
+
+
+def extend_points(ax, layer, points, new_points):
+    """
+    Add points to markers drawn by the plot_points() function.
+
+    Markers are appended while there are no more than lod_points points,
+    then the sampler of the view is extended or made.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axis of a diagram.
+    layer : matplotlib.collections.PathCollection
+        The collection made by the plot_points() function.
+    points : tuple
+        A tuple made of two ndarrays with x, y coordinates of all points.
+    new_points : tuple
+        A tuple made of two ndarrays with coordinates of the new points.
+    """
+    if ax.points_sampler is None and len(points[0]) <= lod_points:
+        layer.set_offsets(concatenate((layer.get_offsets(),
+                                       column_stack(new_points))))
+        extend_data_limits(ax, new_points)
+        return
+
+    if ax.points_sampler is None:
+        ax.points_sampler = ViewSampler(points[0], points[1])
+        ax.callbacks.connect('xlim_changed', lambda ax: update_points_sample(
+            ax, layer, ax.points_data))
+        ax.callbacks.connect('ylim_changed', lambda ax: update_points_sample(
+            ax, layer, ax.points_data))
+    else:
+        ax.points_sampler.extend(points[0], points[1])
+
+    # Changed limits choose the sample again by themselves.
+    limits = ax.get_xlim(), ax.get_ylim()
+    extend_data_limits(ax, new_points)
+    if limits == (ax.get_xlim(), ax.get_ylim()):
+        update_points_sample(ax, layer, points)
+
+
+def extend_density(ax, image, points, new_points):
+    """
+    Add points to a density map drawn by the plot_density() function.
+
+    Counts of the new points are added to the shown counts. If the bounds
+    of points grow, the map is computed again for the new limits.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axis of a diagram.
+    image : matplotlib.image.AxesImage
+        The image of the density map.
+    points : tuple
+        A tuple made of two ndarrays with x, y coordinates of all points.
+    new_points : tuple
+        A tuple made of two ndarrays with coordinates of the new points.
+    """
+    image.density_points = points
+    bounds = image.density_bounds
+    finite = isfinite(new_points[0]) & isfinite(new_points[1])
+
+    if finite.any():
+        new_bounds = points_bounds(new_points)
+        bounds = (min(bounds[0], new_bounds[0]), max(bounds[1], new_bounds[1]),
+                  min(bounds[2], new_bounds[2]), max(bounds[3], new_bounds[3]))
+
+    if bounds != image.density_bounds or not image.get_visible():
+        image.density_bounds = bounds
+        # Changed limits compute the map again by themselves.
+        limits = ax.get_xlim(), ax.get_ylim()
+        extend_data_limits(ax, new_points)
+        if limits == (ax.get_xlim(), ax.get_ylim()):
+            update_density(ax, image)
+        return
+
+    counts = image.get_array().filled(0)
+    extent = image.get_extent()
+    counts = counts + points_density(new_points[0], new_points[1],
+                                     extent[:2], extent[2:],
+                                     counts.shape[::-1])
+    show_density(ax, image, counts, extent)
+
+
+def points_offsets(points):
+    """
+    Transform points to offsets of a collection.
+
+    Parameters
+    ----------
+    points : tuple
+        A tuple made of two sequences with x, y coordinates or an empty tuple.
+
+    Returns
+    -------
+    ndarray
+        An array with the shape (N, 2).
+    """
+    if points == ():
+        return empty((0, 2))
+
+    return column_stack(points)
+
+
+def update_marked_points(figures, data, columns_argument, marked_data=()):
+    """
+    Update marked points on all diagrams drawn before.
+
+    Parameters
+    ----------
+    figures : tuple
+        A tuple with figures returned by the get_figures() function.
+    data : tuple
+        A value returned by the get_data() function.
+    columns_argument : list
+        A nested list which contains sublists. Each sublist is made of
+        two integers. The numbers are indexes of columns to be used.
+    marked_data : tuple
+        A tuple which can contain subtuples or be empty. Each subtuple
+        represents a set of points coming from a data column.
+    """
+    for figure, columns in zip(figures, columns_argument):
+        marked_points = get_marked_points(data, marked_data, columns)
+        offsets = points_offsets(marked_points)
+        marked_layer = figure.axes[0].marked_layer
+        if not array_equal(marked_layer.get_offsets(), offsets):
+            marked_layer.set_offsets(offsets)
+            schedule_redraw(figure)
+
+
+def schedule_redraw(figure):
+    """
+    Mark a figure to be redrawn at the end of the current frame.
+
+    All figures marked within redraw_interval milliseconds are redrawn
+    together, each one once, by a single-shot timer of the canvas. If
+    the canvas doesn't support timers, e.g. it's a non-interactive one,
+    the figures are redrawn immediately.
+
+    Parameters
+    ----------
+    figure : matplotlib.figure.Figure
+        A single figure.
+    """
+    global redraw_timer
+
+    if figure not in dirty_figures:
+        dirty_figures.append(figure)
+    if redraw_timer is not None:
+        return
+
+    redraw_timer = figure.canvas.new_timer(interval=redraw_interval)
+    if type(redraw_timer) is TimerBase:
+        flush_redraws()
+        return
+    redraw_timer.single_shot = True
+    redraw_timer.add_callback(flush_redraws)
+    redraw_timer.start()
+
+
+def flush_redraws():
+    """
+    Redraw marked points of all figures scheduled to be redrawn.
+    """
+    global redraw_timer
+
+    if redraw_timer is not None:
+        redraw_timer.stop()
+        redraw_timer = None
+    figures = tuple(dirty_figures)
+    del dirty_figures[:]
+
+    with stage("flush_redraws") as record:
+        for figure in figures:
+            redraw_marked_points(figure)
+        record["figures"] = len(figures)
+        record["points"] = sum(len(figure.axes[0].marked_layer.get_offsets())
+                               for figure in figures)
+
 
-    ax.scatter(points[0], points[1], 50, alpha=0.0, picker=3)
-    figure.canvas.draw_idle()
+def drawn_points(figures):
+    """
+    Count points shown on diagrams.
+
+    Parameters
+    ----------
+    figures : tuple
+        A tuple with figures drawn by the draw_all_figures() function.
+
+    Returns
+    -------
+    int
+        The number of markers of all layers. Points of a density map are
+        counted as if they were markers.
+    """
+    number = 0
+
+    for figure in figures:
+        ax = figure.axes[0]
+        layers = ax.colored_layers + (ax.marked_layer,)
+        if isinstance(ax.points_layer, AxesImage):
+            number += len(ax.points_data[0])
+        else:
+            layers += ax.points_layer,
+        number += sum(len(layer.get_offsets()) for layer in layers)
+
+    return number
+
+
+def uses_blitting(figure):
+    """
+    Check whether marked points of a figure are drawn by blitting.
+
+    Parameters
+    ----------
+    figure : matplotlib.figure.Figure
+        A single figure.
+
+    Returns
+    -------
+    bool
+        True if blitting is switched on and the canvas supports it.
+    """
+    return blitting and figure.canvas.supports_blit
+
+
+def cache_background(event):
+    """
+    Store backgrounds of diagrams after a window has been drawn entirely.
+
+    Each diagram of the window gets its own background, which contains
+    everything except marked points. They are animated and drawn on the top
+    of it. The function is connected to the 'draw_event'.
+
+    Parameters
+    ----------
+    event : matplotlib.backend_bases.DrawEvent
+        An event emitted after the figure has been drawn.
+    """
+    window = event.canvas.figure
+
+    for figure in getattr(window, 'diagrams', (window,)):
+        figure.marked_background = event.canvas.copy_from_bbox(figure.bbox)
+        blit_marked_points(figure)
+
+
+def blit_marked_points(figure):
+    """
+    Draw marked points on the cached background of a figure.
+
+    Parameters
+    ----------
+    figure : matplotlib.figure.Figure
+        A single figure.
+    """
+    ax = figure.axes[0]
+    figure.canvas.restore_region(figure.marked_background)
+    ax.draw_artist(ax.marked_layer)
+    figure.canvas.blit(figure.bbox)
+
+
+def redraw_marked_points(figure):
+    """
+    Show changed marked points of a figure.
+
+    Only marked points are drawn if the background of the figure is cached,
+    otherwise the whole figure is drawn.
+
+    Parameters
+    ----------
+    figure : matplotlib.figure.Figure
+        A single figure.
+    """
+    if uses_blitting(figure) and hasattr(figure, 'marked_background'):
+        blit_marked_points(figure)
+    else:
+        figure.canvas.draw_idle()
 
 
 def save_all_figures(filename, data, columns_argument, groups_argument,
-                     marked_data=(), colored_data=(), save_images=True):
+                     marked_data=(), colored_data=(), save_images=True,
+                     image_format=None, dpi=None):
     """
     Save all diagrams to image files.
 
@@ -196,7 +866,7 @@ def save_all_figures(filename, data, columns_argument, groups_argument,
     data : tuple
         A nested tuple contains subtuples. Each subtuple is made of the column
         index, the label of the column and the column's data stored in the
-        masked_array.
+        ndarray.
     columns_argument : list
         A nested list which contains sublists. Each sublist is made of
         two integers. The numbers are indexes of columns to be used.
@@ -209,11 +879,17 @@ def save_all_figures(filename, data, columns_argument, groups_argument,
         represents a set of points coming from a data column.
     colored_data : tuple
         A tuple which can contain subtuples or be empty. Each subtuple
-        contains masked_arrays with data only for colored points and a string
+        contains ndarrays with data only for colored points and a string
         which represents a color name.
     save_images : bool
-        A switch between displaying windows and saving images to PNG files.
+        A switch between displaying windows and saving images to files.
         Default is True.
+    image_format : str
+        The extension of images, e.g. 'png', 'pdf' or 'svg'. By default
+        it's the image_format.
+    dpi : int
+        The resolution of rasterized layers in vector formats. By default
+        it's the raster_dpi.
     """
     figures = ()
     global image_number
@@ -225,13 +901,14 @@ def save_all_figures(filename, data, columns_argument, groups_argument,
         figures += figure,
 
     draw_all_figures(filename, figures, data, columns_argument,
-                     groups_argument, marked_data, colored_data, save_images)
+                     groups_argument, marked_data, colored_data, save_images,
+                     image_format=image_format, dpi=dpi)
 
 
 def save_diagram(filename, figure, points, axes_labels, marked_points=(),
-                 colored_points=()):
+                 colored_points=(), image_format=None, dpi=None):
     """
-    Save current diagrams to the PNG images.
+    Save current diagrams to images.
 
     Parameters
     ----------
@@ -242,36 +919,248 @@ def save_diagram(filename, figure, points, axes_labels, marked_points=(),
     figure : matplotlib.figure.Figure
         A single figure.
     points : tuple
-        A tuple made of two masked_arrays. The arrays store x, y coordinates
+        A tuple made of two ndarrays. The arrays store x, y coordinates
         of each point which is plotted on a diagram.
     marked_data : tuple
         A tuple which can contain subtuples or be empty. Each subtuple
         represents a set of points coming from a data column.
     colored_data : tuple
         A tuple which can contain subtuples or be empty. Each subtuple
-        contains masked_arrays with data only for colored points and a string
+        contains ndarrays with data only for colored points and a string
         which represents a color name.
+    image_format : str
+        The extension of images, e.g. 'png', 'pdf' or 'svg'. By default
+        it's the image_format.
+    dpi : int
+        The resolution of rasterized layers in vector formats. By default
+        it's the raster_dpi.
     """
     ax = figure.axes[0]
-    ax.scatter(points[0], points[1], 60, c='gray', alpha=0.4, zorder=1)
+    ax.scatter(points[0], points[1], 60, c='gray', alpha=0.4, zorder=1,
+               rasterized=True)
 
     if marked_points != ():
         ax.scatter(marked_points[0], marked_points[1], 100, c='red',
                    alpha=1.0, zorder=3)
     if colored_points != ():
         for cp in colored_points:
-            ax.scatter(cp[0], cp[1], 60, c=cp[2], alpha=0.6, zorder=2)
+            ax.scatter(cp[0], cp[1], 60, c=cp[2], alpha=0.6, zorder=2,
+                       rasterized=True)
 
-    ax.scatter(points[0], points[1], 50, alpha=0.0, picker=3)
-    filename = saved_filename(filename, axes_labels)
+    filename = saved_filename(filename, axes_labels, image_format)
     figure.set_size_inches(10.0, 10.0, forward=True)
-    figure.savefig(filename)
+    save_image(figure, filename, dpi)
     plt.close(figure)
 
 
-def saved_filename(filename, axes_labels):
+def save_image(figure, filename, dpi=None):
+    """
+    Save a figure to an image in the format given by the filename extension.
+
+    Layers of points and groups are rasterized. In vector formats they are
+    embedded as images of dpi resolution, while axes, labels and
+    marked points stay vectors. Other formats use the resolution of
+    the figure.
+
+    Parameters
+    ----------
+    figure : matplotlib.figure.Figure
+        A single figure.
+    filename : str
+        The name of the image.
+    dpi : int
+        The resolution of rasterized layers in vector formats. By default
+        it's the raster_dpi.
+    """
+    if filename.rsplit('.', 1)[-1].lower() in vector_formats:
+        figure.savefig(filename, dpi=raster_dpi if dpi is None else dpi)
+    else:
+        figure.savefig(filename)
+
+
+def save_snapshot(filename, figures, image_format=None, dpi=None):
     """
-    Generate a filename of the PNG image.
+    Save current diagrams of all figures to images in the background.
+
+    The state of each diagram is copied at once, then the images are drawn
+    on separate Agg figures by a worker thread, so windows stay responsive.
+    Whole data columns, groups and marked points are reused as they are,
+    a density map is reused as an image. The label of the snapshot button
+    shows the status of saving.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file which contains columns with integers and floats
+        separated by spaces. The first column should contain integers, the
+        rest of them - floats.
+    figures : tuple
+        A tuple with figures drawn by the draw_all_figures() function.
+    image_format : str
+        The extension of images, e.g. 'png', 'pdf' or 'svg'. By default
+        it's the image_format.
+    dpi : int
+        The resolution of rasterized layers in vector formats. By default
+        it's the raster_dpi.
+
+    Returns
+    -------
+    concurrent.futures.Future
+        The future of the saving. Its result is a tuple with names of
+        the images.
+    """
+    global image_number, snapshot_executor
+    image_number += 1
+    diagrams = tuple(copy_diagram(filename, figure, image_format)
+                     for figure in figures)
+
+    if snapshot_executor is None:
+        snapshot_executor = ThreadPoolExecutor(max_workers=1)
+    future = snapshot_executor.submit(
+        lambda: tuple(save_copied_diagram(*diagram, dpi=dpi)
+                      for diagram in diagrams))
+    show_snapshot_status(figures, future)
+
+    return future
+
+
+def copy_diagram(filename, figure, image_format=None):
+    """
+    Copy the current state of a diagram needed to draw it again.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the data file.
+    figure : matplotlib.figure.Figure
+        A figure drawn by the plot_diagram() function.
+    image_format : str
+        The extension of the image. By default it's the image_format.
+
+    Returns
+    -------
+    tuple
+        A tuple made of the name of the image, axes labels, the number of
+        points, limits of axes and layers. Each layer is a tuple which
+        describes either an image ('image', counts, extent, color limits)
+        or markers ('markers', x, y, sizes, face colors, zorder, whether
+        to rasterize them).
+    """
+    ax = figure.axes[0]
+    axes_labels = ax.get_xlabel(), ax.get_ylabel()
+    layers = ()
+
+    if isinstance(ax.points_layer, AxesImage):
+        if ax.points_layer.get_visible():
+            layers += ('image', ax.points_layer.get_array(),
+                       ax.points_layer.get_extent(),
+                       ax.points_layer.get_clim()),
+    else:
+        layers += ('markers', ax.points_data[0], ax.points_data[1],
+                   ax.points_layer.get_sizes(),
+                   ax.points_layer.get_facecolors(),
+                   ax.points_layer.get_zorder(), True),
+    for layer in ax.colored_layers + (ax.marked_layer,):
+        offsets = layer.get_offsets()
+        layers += ('markers', offsets[:, 0], offsets[:, 1], layer.get_sizes(),
+                   layer.get_facecolors(), layer.get_zorder(),
+                   layer is not ax.marked_layer),
+
+    return (saved_filename(filename, axes_labels, image_format), axes_labels,
+            len(ax.points_data[0]), (ax.get_xlim(), ax.get_ylim()), layers)
+
+
+def save_copied_diagram(image_filename, axes_labels, points_number, limits,
+                        layers, dpi=None):
+    """
+    Draw a copied diagram on a new Agg figure and save it.
+
+    The function doesn't use pyplot, so it can be called from any thread.
+    Positional parameters are elements of a tuple returned by
+    the copy_diagram() function. The dpi is passed to the save_image()
+    function.
+
+    Returns
+    -------
+    str
+        The name of the image.
+    """
+    figure = Figure(figsize=(10.0, 10.0))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    set_axes_labels(figure, axes_labels, points_number)
+
+    for layer in layers:
+        if layer[0] == 'image':
+            ax.imshow(layer[1], cmap=density_colormap, norm=LogNorm(*layer[3]),
+                      origin='lower', extent=layer[2], aspect='auto',
+                      interpolation='nearest', zorder=1)
+        else:
+            ax.scatter(layer[1], layer[2], layer[3], facecolors=layer[4],
+                       zorder=layer[5], rasterized=layer[6])
+    ax.set_xlim(limits[0])
+    ax.set_ylim(limits[1])
+    save_image(figure, image_filename, dpi)
+
+    return image_filename
+
+
+def show_snapshot_status(figures, future):
+    """
+    Show the status of saving a snapshot on snapshot buttons.
+
+    The future is polled by a timer of the canvas every
+    snapshot_poll_interval milliseconds. If the canvas doesn't support
+    timers, the function waits for the future.
+
+    Parameters
+    ----------
+    figures : tuple
+        A tuple with figures which have snapshot buttons.
+    future : concurrent.futures.Future
+        The future returned by the save_snapshot() function.
+    """
+    def poll():
+        if not future.done():
+            return True
+        if future.exception() is None:
+            set_snapshot_label(figures, 'Saved')
+        else:
+            print("Snapshot failed: {!r}".format(future.exception()))
+            set_snapshot_label(figures, 'Failed')
+        return False
+
+    set_snapshot_label(figures, 'Saving...')
+    timer = figures[0].canvas.new_timer(interval=snapshot_poll_interval)
+
+    if type(timer) is TimerBase:
+        wait([future])
+        poll()
+        return
+    timer.add_callback(poll)
+    figures[0].snapshot_timer = timer
+    timer.start()
+
+
+def set_snapshot_label(figures, label):
+    """
+    Change labels of snapshot buttons.
+
+    Parameters
+    ----------
+    figures : tuple
+        A tuple with figures which have snapshot buttons.
+    label : str
+        A new label.
+    """
+    for figure in figures:
+        figure.axes[0].save_button.label.set_text(label)
+        figure.canvas.draw_idle()
+
+
+def saved_filename(filename, axes_labels, extension=None):
+    """
+    Generate a filename of an image.
 
     Parameters
     ----------
@@ -282,50 +1171,285 @@ def saved_filename(filename, axes_labels):
     axes_labels : tuple
         A tuple with two elements. Each one is a string which describes
         a single axis of a diagram.
+    extension : str
+        The extension of the image. By default it's the image_format.
 
     Returns
     -------
     save_filename : string
-        A name of a file to save as a PNG image.
+        A name of a file to save as an image.
     """
     global image_number
+    extension = image_format if extension is None else extension
     save_filename = (filename + "_" + axes_labels[1] + "_" + axes_labels[0]
-                     + "_" + str(image_number) + ".png")
+                     + "_" + str(image_number) + "." + extension)
 
     return save_filename
 
 
-def connect_figures(filename, figures, all_data, data,
+def get_points_grid(ax):
+    """
+    Get a grid of points of a diagram in display coordinates.
+
+    The grid is built again only if the view of the diagram has changed
+    since the last call, e.g. after zooming, panning or resizing.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axis of a diagram drawn by the plot_diagram() function.
+
+    Returns
+    -------
+    PointsGrid
+        A grid with points of the diagram in display coordinates. If the
+        diagram has a sampler, only points inside the view are used and
+        their indexes in data are stored as the data_indexes attribute.
+    """
+    view = ax.transData.get_matrix()
+
+    if ax.points_grid is None or not array_equal(ax.points_view, view):
+        points = ax.points_data
+        if ax.points_sampler is not None:
+            indexes = ax.points_sampler.inside(ax.get_xlim(), ax.get_ylim())
+            points = points[0][indexes], points[1][indexes]
+        else:
+            indexes = None
+        x, y = ax.transData.transform(points_offsets(points)).T
+        ax.points_grid = PointsGrid(x, y, pick_radius_pixels(ax.figure))
+        ax.points_grid.data_indexes = indexes
+        ax.points_view = view
+
+    return ax.points_grid
+
+
+def pick_radius_pixels(figure):
+    """
+    Convert the pick radius from points to pixels.
+
+    Parameters
+    ----------
+    figure : matplotlib.figure.Figure
+        A single figure.
+
+    Returns
+    -------
+    float
+        The radius in pixels.
+    """
+    return pick_radius * figure.dpi / 72.0
+
+
+def find_clicked_points(event):
+    """
+    Find indexes of points under the mouse cursor.
+
+    Parameters
+    ----------
+    event : matplotlib.backend_bases.MouseEvent
+        An event emitted after a mouse button has been pressed.
+
+    Returns
+    -------
+    ndarray
+        Sorted indexes of points. It's empty if no diagram was clicked,
+        a region selector or a tool of the navigation toolbar is active.
+    """
+    ax = event.inaxes
+    toolbar = event.canvas.toolbar
+
+    if (ax is None or not hasattr(ax, 'points_data')
+            or getattr(ax, 'selection_mode', 'Pick') != 'Pick'
+            or (toolbar is not None and toolbar.mode)):
+        return empty(0, dtype=int)
+
+    grid = get_points_grid(ax)
+    indexes = grid.near(event.x, event.y, pick_radius_pixels(ax.figure))
+
+    if grid.data_indexes is not None:
+        indexes = sort(grid.data_indexes[indexes])
+
+    return indexes
+
+
+def connect_selectors(figure, select_points):
+    """
+    Let the selection button of a diagram switch region selectors.
+
+    The button goes through the selection_modes. Only the selector of
+    the current mode exists, because every selector which uses blitting
+    draws the whole canvas once more after each draw. Points inside
+    a region are found among all points of the diagram, not only among
+    drawn ones.
+
+    Parameters
+    ----------
+    figure : matplotlib.figure.Figure
+        A figure drawn by the plot_diagram() function.
+    select_points : function
+        A function called with an ndarray of indexes of selected points.
+    """
+    ax = figure.axes[0]
+    ax.selection_mode = selection_modes[0]
+    ax.selector = None
+    ax.select_button.on_clicked(
+        lambda event: switch_selection_mode(ax, select_points))
+
+
+def get_selector(ax, mode, select_points):
+    """
+    Create a region selector for a diagram.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axis of a diagram drawn by the plot_diagram() function.
+    mode : str
+        'Lasso' or 'Box'.
+    select_points : function
+        A function called with an ndarray of indexes of selected points.
+
+    Returns
+    -------
+    matplotlib.widgets.LassoSelector or matplotlib.widgets.RectangleSelector
+        The selector of the mode.
+    """
+    useblit = uses_blitting(ax.figure)
+
+    # Points are taken when a region is selected, since they can grow.
+    if mode == 'Lasso':
+        return LassoSelector(
+            ax, lambda vertices: select_points(
+                points_in_polygon(*ax.points_data, vertices)),
+            useblit=useblit)
+
+    return RectangleSelector(
+        ax, lambda press, release: select_points(
+            points_in_rectangle(*ax.points_data,
+                                (press.xdata, release.xdata),
+                                (press.ydata, release.ydata))),
+        useblit=useblit, minspanx=5, minspany=5, spancoords='pixels')
+
+
+def switch_selection_mode(ax, select_points):
+    """
+    Activate the next mode of selecting points on a diagram.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axis of a diagram passed to the connect_selectors() function.
+    select_points : function
+        A function called with an ndarray of indexes of selected points.
+    """
+    mode = selection_modes[(selection_modes.index(ax.selection_mode) + 1)
+                           % len(selection_modes)]
+    ax.selection_mode = mode
+
+    if ax.selector is not None:
+        ax.selector.set_active(False)
+        ax.selector.disconnect_events()
+        for artist in ax.selector.artists:
+            artist.remove()
+        ax.selector = None
+    if mode != selection_modes[0]:
+        ax.selector = get_selector(ax, mode, select_points)
+    ax.select_button.label.set_text(mode)
+    ax.figure.canvas.draw_idle()
+
+
+def connect_figures(filename, figures, catalog, data,
                     columns_argument, groups_argument, talk_argument,
-                    marked_data=(), colored_data=()):
+                    marked_data=(), colored_data=(), watch_interval=None,
+                    image_format=None, dpi=None):
     """
     Create a connection between all figures.
+
+    Snapshots are saved as image_format images with dpi resolution of
+    rasterized layers, see the save_snapshot() function.
+
+    If watch_interval (in milliseconds) is given, the catalog, which must
+    be a TailedCatalog or a FilteredCatalog of it, is extended by a timer
+    of the canvas and rows appended to the data file are shown on all
+    figures.
     """
-    def pick_point(event):
+    def select_points(indexes, toggle=False):
         global marked_data_indexes
 
-        if array_equal(marked_data_indexes, event.ind):
-            marked_data_indexes = ()
-        else:
-            marked_data_indexes = event.ind
-        marked_data = mark_points(data, marked_data_indexes)
-        draw_all_figures(filename, figures, data,
-                         columns_argument, groups_argument,
-                         marked_data, colored_data)
+        if toggle and array_equal(marked_data_indexes, indexes):
+            indexes = empty(0, dtype=int)
+        marked_data_indexes = asarray(indexes, dtype=int)
+
+        with stage("mark_points") as record:
+            selected_data = mark_points(data, marked_data_indexes)
+            record["selected"] = len(marked_data_indexes)
+        with stage("update_marked_points") as record:
+            update_marked_points(figures, data, columns_argument,
+                                 selected_data)
+            record["points"] = sum(
+                len(figure.axes[0].marked_layer.get_offsets())
+                for figure in figures)
 
         if talk_argument:
-            feedback(all_data, marked_data_indexes)
+            with stage("feedback"):
+                feedback(catalog, marked_data_indexes)
+
+    def pick_point(event):
+        with stage("pick_point") as record:
+            indexes = find_clicked_points(event)
+            record["clicked"] = len(indexes)
+
+            if len(indexes) != 0:
+                select_points(indexes, toggle=True)
+            record["points"] = drawn_points(figures)
+
+    def watch_file():
+        nonlocal data, colored_data
+
+        with stage("watch_file") as record:
+            start = len(catalog)
+            rows_number = catalog.extend()
+            record["rows"] = rows_number
+            if rows_number == 0:
+                return
+
+            data = get_data(catalog, columns_argument)
+            colored_data = extend_color_data(colored_data, groups_numbers,
+                                             catalog, data, start)
+            extend_all_figures(figures, data, columns_argument,
+                               groups_argument, colored_data, rows_number)
+            record["points"] = drawn_points(figures)
 
     for figure in figures:
         figure.axes[0].save_button.on_clicked(
-            lambda event: save_all_figures(
-                filename, data, columns_argument, groups_argument,
-                mark_points(data, marked_data_indexes), colored_data))
-        figure.canvas.mpl_connect('pick_event', pick_point)
+            lambda event: save_snapshot(filename, figures, image_format,
+                                        dpi))
+        connect_selectors(figure, select_points)
+
+    canvases = []
+    for figure in figures:
+        if figure.canvas in canvases:
+            continue
+        canvases.append(figure.canvas)
+        figure.canvas.mpl_connect('button_press_event', pick_point)
+        if uses_blitting(figure):
+            figure.canvas.mpl_connect('draw_event', cache_background)
+
+    if watch_interval is not None:
+        # Group files are read once, new rows are matched against them.
+        groups_numbers = tuple(sort(read_group_numbers(group_argument[0]))
+                               for group_argument in groups_argument or ())
+        figures[0].watch_timer = figures[0].canvas.new_timer(
+            interval=watch_interval)
+        figures[0].watch_timer.add_callback(watch_file)
+        figures[0].watch_timer.start()
 
 
 def trigger_windows(filename, columns_argument, groups_argument,
-                    talk_argument):
+                    talk_argument, density_argument='auto',
+                    grid_argument=False, stream_argument=None,
+                    watch_argument=None, where_argument=None,
+                    image_format=None, dpi=None):
     """
     Generate a tuple with figures, i.e. diagrams.
 
@@ -344,21 +1468,59 @@ def trigger_windows(filename, columns_argument, groups_argument,
         integers. The second is a color name.
     talk_argument : bool
         This value is resposible for displaying the feedback button.
+    density_argument : str
+        'on', 'off' or 'auto'. Decides whether points are drawn as
+        a density map.
+    grid_argument : bool
+        If True, all diagrams are drawn as panels of a single window.
+    stream_argument : str
+        None, 'float64' or 'float32'. If given, the file is streamed
+        block by block and only the used columns are kept as values
+        of this type.
+    watch_argument : float
+        If given, the file is streamed and polled every watch_argument
+        seconds for appended rows, which are shown on all diagrams.
+    where_argument : str
+        If given, only rows which meet this condition are used. See
+        the parse_where() function.
+    image_format : str
+        The extension of snapshots, e.g. 'png', 'pdf' or 'svg'. By default
+        it's the image_format.
+    dpi : int
+        The resolution of rasterized layers in vector snapshots. By default
+        it's the raster_dpi.
     """
-    all_data = read_file_content(filename)
-    figures = get_figures(columns_argument, talk_argument, all_data)
-    data = get_data(filename, columns_argument)
+    catalog = open_catalog(filename, columns_argument, stream_argument,
+                           watch_argument is not None, where_argument)
+    colors = ()
 
+    # Points are counted when they're drawn, empty figures have none.
+    with stage("get_figures") as record:
+        figures = get_figures(columns_argument, talk_argument, catalog,
+                              grid_argument)
+        record["points"] = 0
+    # The file is read (and the condition is evaluated) in stages of its
+    # own, so get_data only gathers columns.
+    catalog.load()
+    with stage("get_data") as record:
+        data = get_data(catalog, columns_argument)
+        record["rows"] = len(data[-1][-1])
+        record["points"] = 0
     if groups_argument:
-        colors = get_color_data(filename, groups_argument, data)
-        draw_all_figures(filename, figures, data, columns_argument,
-                         groups_argument, colored_data=colors)
-        connect_figures(filename, figures, all_data, data, columns_argument,
-                        groups_argument, talk_argument, colored_data=colors)
-    else:
+        with stage("get_color_data") as record:
+            colors = get_color_data(catalog, groups_argument, data)
+            record["points"] = 0
+    with stage("draw_all_figures") as record:
         draw_all_figures(filename, figures, data, columns_argument,
-                         groups_argument)
-        connect_figures(filename, figures, all_data, data, columns_argument,
-                        groups_argument, talk_argument)
+                         groups_argument, colored_data=colors,
+                         density_argument=density_argument)
+        record["points"] = drawn_points(figures)
+    with stage("connect_figures") as record:
+        connect_figures(filename, figures, catalog, data, columns_argument,
+                        groups_argument, talk_argument, colored_data=colors,
+                        watch_interval=None if watch_argument is None
+                        else int(watch_argument * 1000),
+                        image_format=image_format, dpi=dpi)
+        record["points"] = drawn_points(figures)
 
     plt.show()
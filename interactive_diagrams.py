@@ -5,6 +5,8 @@ from argparse import ArgumentParser, RawTextHelpFormatter
 from textwrap import dedent
 from idgrms.data import *
 from idgrms.plotdgrms import *
+from idgrms.batch import *
+from idgrms import instrument
 
 
 argparser = ArgumentParser(
@@ -15,6 +17,7 @@ argparser = ArgumentParser(
 )
 argparser.add_argument(
     'data_file',
+    nargs='+',
     help=dedent('''\
     The name of a file which must contain columns with data:
     id value_1 value_2 value_3 ...
@@ -25,6 +28,8 @@ argparser.add_argument(
     be float. Additionally, the file must contain a one-line
     header. The header must be preceded by # sign. Labels from
     the header are used to mark axes on diagrams.
+
+    Many files can be given only with the --batch option.
     ''')
 )
 argparser.add_argument(
@@ -66,6 +71,95 @@ argparser.add_argument(
     '''),
     action='store_true'
 )
+argparser.add_argument(
+    '--density',
+    help=dedent('''\
+    Draw points as a density map instead of markers: on, off or
+    auto. The auto mode uses the map for more than 200000 points.
+    Marked points and groups are always drawn as markers.
+    '''),
+    choices=('auto', 'on', 'off'),
+    default='auto'
+)
+argparser.add_argument(
+    '--grid',
+    help=dedent('''\
+    Draw all diagrams as panels of a single window instead of
+    separate windows.
+    '''),
+    action='store_true'
+)
+argparser.add_argument(
+    '--stream',
+    help=dedent('''\
+    Read the data file block by block and keep only the used
+    columns, so files larger than memory can be shown. Values
+    are kept as float64 or, to halve the memory, as float32.
+    '''),
+    choices=('float64', 'float32'),
+    nargs='?',
+    const='float64'
+)
+argparser.add_argument(
+    '--watch',
+    help=dedent('''\
+    Poll the data file every [seconds] (1 by default) and show
+    rows appended to it. Only the new bytes are parsed. The file
+    is read like with --stream.
+    '''),
+    type=float,
+    nargs='?',
+    const=1.0,
+    metavar='seconds'
+)
+argparser.add_argument(
+    '--where',
+    help=dedent('''\
+    Use only rows which meet a condition made of column labels,
+    numbers, arithmetic, comparisons, and/or/not and abs, sqrt,
+    log10, isfinite, isnan, e.g. "errV < 0.02 and V < 18".
+    Put labels which aren't names between backticks: `B-V`.
+    '''),
+    metavar='expression'
+)
+argparser.add_argument(
+    '--batch',
+    help=dedent('''\
+    Save all diagrams of each data file to images without
+    displaying windows. Files are rendered in parallel.
+    '''),
+    action='store_true'
+)
+argparser.add_argument(
+    '--format',
+    help=dedent('''\
+    The format of saved images: png, pdf or svg. In pdf and svg
+    points and groups are rasterized, while axes, labels and
+    marked points stay vectors.
+    '''),
+    choices=('png', 'pdf', 'svg'),
+    default='png'
+)
+argparser.add_argument(
+    '--dpi',
+    help=dedent('''\
+    The resolution of rasterized layers in pdf and svg images.
+    '''),
+    type=int,
+    default=150
+)
+argparser.add_argument(
+    '--profile',
+    help=dedent('''\
+    Print the wall time and the peak memory of startup stages
+    and of each click to stderr, or append them to [file] as
+    JSON lines. The IDGRMS_PROFILE environment variable does
+    the same.
+    '''),
+    nargs='?',
+    const='-',
+    metavar='file'
+)
 argparser.add_argument(
     '-v',
     '--version',
@@ -78,5 +172,27 @@ argparser.add_argument(
     * ''' + argparser.epilog)
 )
 
-args = argparser.parse_args()
-trigger_windows(args.data_file, args.columns, args.grp, args.t)
+if __name__ == "__main__":
+    args = argparser.parse_args()
+    if args.profile:
+        instrument.enable(args.profile)
+
+    if args.batch:
+        images, failed = render_files(args.data_file, args.columns, args.grp,
+                                      image_format=args.format, dpi=args.dpi,
+                                      where=args.where)
+        for image in images:
+            print(image)
+        if failed:
+            exit(1)
+    elif len(args.data_file) > 1:
+        argparser.error("many data files can be given only with --batch")
+    else:
+        if args.where is not None:
+            try:
+                parse_where(args.where, read_file_header(args.data_file[0]))
+            except ValueError as error:
+                argparser.error(str(error))
+        trigger_windows(args.data_file[0], args.columns, args.grp, args.t,
+                        args.density, args.grid, args.stream, args.watch,
+                        args.where, args.format, args.dpi)
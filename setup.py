@@ -12,8 +12,9 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/pbrus/interactive-diagrams",
-    packages=setuptools.find_packages(exclude=["tests"]),
-    install_requires=["numpy>=1.14.0", "matplotlib"],
+    packages=setuptools.find_packages(exclude=["tests", "benchmarks"]),
+    install_requires=["numpy>=1.15.0", "matplotlib>=3.4.0"],
+    python_requires=">=3.9",
     scripts=["interactive_diagrams.py"],
     tests_require=["pytest"],
     keywords=["interactive", "diagrams", "scatter", "plot"],
@@ -23,9 +24,10 @@ setuptools.setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
         "Programming Language :: Python",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
+        "Programming Language :: Python :: 3.12",
         "Topic :: Scientific/Engineering :: Astronomy",
         "Topic :: Utilities",
     ],
@@ -0,0 +1,50 @@
+"""
+Test package of the idgrms.batch module
+"""
+import os
+import shutil
+import pytest
+from idgrms import plotdgrms
+from idgrms.batch import *
+
+
+@pytest.fixture
+def data_files(tmp_path):
+    filenames = [str(tmp_path / name) for name in ("a.db", "b.db")]
+    for filename in filenames:
+        shutil.copy('example_data/mags.db', filename)
+    return filenames
+
+
+def test_render_file(data_files, monkeypatch):
+    use_agg()
+    monkeypatch.setattr(plotdgrms, "image_number", 4)
+    images = render_file(data_files[0], [[12, -10], [12, -4]])
+    assert images == (data_files[0] + "_U-B_B-V_1.png",
+                      data_files[0] + "_B_B-V_1.png")
+    assert all(os.path.getsize(image) > 0 for image in images)
+    assert plotdgrms.image_number == 4
+
+
+def test_render_files(data_files, tmp_path, capsys):
+    missing = str(tmp_path / "missing.db")
+    images, failed = render_files(data_files + [missing, data_files[0]],
+                                  [[12, -4]],
+                                  [["example_data/better.num", "red"]],
+                                  workers=2)
+    assert images == tuple(filename + "_B_B-V_1.png"
+                           for filename in data_files)
+    assert all(os.path.exists(image) for image in images)
+    assert failed == (missing,)
+    assert missing in capsys.readouterr().out
+
+
+def test_render_file_vector(data_files):
+    use_agg()
+    images = render_file(data_files[0], [[12, -4]], image_format='svg',
+                         dpi=50)
+    assert images == (data_files[0] + "_B_B-V_1.svg",)
+    with open(images[0]) as image:
+        assert "<image" in image.read()
+    assert plotdgrms.image_format == 'png'
+    assert plotdgrms.raster_dpi == 150
@@ -0,0 +1,80 @@
+"""
+Test package of the idgrms.cache module
+"""
+import os
+import shutil
+import pytest
+import numpy as np
+import idgrms.cache
+import idgrms.data
+from idgrms.cache import *
+from idgrms.data import read_file, read_file_header, _read_file
+
+
+@pytest.fixture(autouse=True)
+def sidecars(monkeypatch):
+    monkeypatch.setattr(idgrms.cache, "use_sidecars", True)
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    filename = str(tmp_path / "mags.db")
+    shutil.copy('example_data/mags.db', filename)
+    return filename
+
+
+def forbid_parsing(monkeypatch):
+    def parse(*args, **kwargs):
+        raise AssertionError("The file was parsed")
+    monkeypatch.setattr(idgrms.data, "_parse_file", parse)
+    monkeypatch.setattr(idgrms.data, "_read_file", parse)
+
+
+def test_write_sidecar(data_file):
+    numbers, content = read_file(data_file)
+    assert os.path.exists(sidecar_filename(data_file))
+    header, cached_numbers, cached_content = read_sidecar(data_file)
+    assert (header == read_file_header(data_file)).all()
+    assert (cached_numbers == numbers).all()
+    assert (cached_content == content).all()
+
+
+def test_read_sidecar(data_file, monkeypatch):
+    content = _read_file(data_file)
+    read_file(data_file)
+    forbid_parsing(monkeypatch)
+    assert (read_file(data_file)[1] == content).all()
+    assert read_file_header(data_file)[1] == 'U'
+
+
+def test_read_sidecar_touched(data_file, monkeypatch):
+    content = _read_file(data_file)
+    read_file(data_file)
+    forbid_parsing(monkeypatch)
+    status = os.stat(data_file)
+    os.utime(data_file, ns=(status.st_atime_ns, status.st_mtime_ns + 10**9))
+    assert (read_file(data_file)[1] == content).all()
+
+
+def test_read_sidecar_changed(data_file):
+    read_file(data_file)
+    with open(data_file, 'a') as file_descriptor:
+        file_descriptor.write("7000 " + "1.0 " * 14 + "\n")
+    assert read_sidecar(data_file) is None
+    numbers = read_file(data_file)[0]
+    assert numbers[-1] == 7000
+    assert read_sidecar(data_file)[1][-1] == 7000
+
+
+def test_read_sidecar_disabled(data_file, monkeypatch):
+    monkeypatch.setattr(idgrms.cache, "use_sidecars", False)
+    read_file(data_file)
+    assert not os.path.exists(sidecar_filename(data_file))
+
+
+def test_read_sidecar_column_major(data_file):
+    read_file(data_file)
+    content = read_file(data_file)[1]
+    assert isinstance(content, np.memmap)
+    assert content[:, 5].flags['C_CONTIGUOUS']
+    assert (content == _read_file(data_file)).all()
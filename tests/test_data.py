@@ -4,10 +4,18 @@ Test package of the idgrms.data module
 import pytest
 from unittest.mock import Mock
 from collections import Counter
-from idgrms.data import _read_file
+import idgrms.cache
+import idgrms.data
+from idgrms.data import _read_file, _parse_file
 from idgrms.data import *
 
 
+@pytest.fixture(autouse=True)
+def no_sidecars(monkeypatch):
+    # Files from example_data are read in place, so no sidecar is written.
+    monkeypatch.setattr(idgrms.cache, "use_sidecars", False)
+
+
 @pytest.fixture
 def data_file():
     return 'example_data/mags.db'
@@ -53,6 +61,31 @@ def test_read_file(data_file):
     assert (last_row == row).all()
 
 
+def test_read_file_numbers(data_file):
+    numbers, content = read_file(data_file)
+    assert (content == _read_file(data_file)).all()
+    assert (numbers == content[:, 0]).all()
+
+
+@pytest.mark.parametrize("c_loadtxt", [True, False])
+def test_parse_file_blocks(data_file, monkeypatch, c_loadtxt):
+    monkeypatch.setattr(idgrms.data, "C_LOADTXT", c_loadtxt)
+    numbers, content = _parse_file(data_file, block_size=1000)
+    assert (content == _read_file(data_file)).all()
+    assert len(numbers) == 303
+
+
+def test_parse_file_large_numbers(tmp_path):
+    filename = tmp_path / "large.db"
+    filename.write_text("# no V\n"
+                        "1152921504606846977 12.5\n"
+                        "# a comment\n"
+                        "-1152921504606846977 13.5\n")
+    numbers, content = _parse_file(str(filename))
+    assert numbers.tolist() == [2**60 + 1, -2**60 - 1]
+    assert content[:, 1].tolist() == [12.5, 13.5]
+
+
 def test_read_file_header(data_file, data_header):
     header = read_file_header(data_file)
     assert (header == data_header).all()
@@ -68,6 +101,192 @@ def test_read_file_content(data_file):
     assert (first_row == row).all()
 
 
+def test_catalog(data_file):
+    catalog = Catalog(data_file)
+    assert (catalog.content == read_file_content(data_file)).all()
+    assert (catalog.numbers[:3] == np.array([6, 10, 12])).all()
+    assert len(catalog) == 303
+
+
+def test_catalog_lazy(data_file):
+    catalog = Catalog(data_file)
+    assert catalog._content is None
+    column = catalog.column(-4)
+    assert column[1] == 'B'
+    assert catalog.column(-4) is column
+    assert (column[-1] == catalog.content[:, 3]).all()
+    catalog = Catalog(data_file)
+    catalog.load()
+    assert catalog._content is not None
+
+
+def test_catalog_rows(data_file):
+    numbers, rows = Catalog(data_file).rows([0, 302])
+    assert numbers.tolist() == [6, 6408]
+    assert (rows[1] == _read_file(data_file)[-1]).all()
+
+
+def test_read_file_columns(data_file, tmp_path):
+    content = read_file_content(data_file)
+    numbers, columns, offsets = read_file_columns(data_file, [12, -4],
+                                                  np.float32, block_size=500)
+    assert columns.dtype == np.float32
+    assert (numbers == Catalog(data_file).numbers).all()
+    assert (columns == content[:, [11, 3]].astype(np.float32)).all()
+    commented = tmp_path / "commented.db"
+    commented.write_bytes(b"# no A\n\n 1 2.5\n# note\n  -3 4\n")
+    numbers, columns, offsets = read_file_columns(str(commented), [2])
+    assert numbers.tolist() == [1, -3]
+    assert offsets.tolist() == [8, 22]
+
+
+@pytest.mark.parametrize("c_loadtxt", [True, False])
+def test_read_file_columns_comment_blocks(data_file, tmp_path, monkeypatch,
+                                          c_loadtxt):
+    monkeypatch.setattr(idgrms.data, "C_LOADTXT", c_loadtxt)
+    lines = open(data_file, 'rb').read().splitlines(keepends=True)
+    commented = tmp_path / "commented.db"
+    commented.write_bytes(b"".join(lines[:50] + [b"# a note\n"] * 5
+                                   + [b"\n"] + lines[50:]))
+    numbers, columns, offsets = read_file_columns(str(commented), [12],
+                                                  block_size=20)
+    assert (numbers == Catalog(data_file).numbers).all()
+    assert (columns[:, 0] == Catalog(data_file).column(12)[-1]).all()
+
+
+def test_streamed_catalog(data_file):
+    catalog = Catalog(data_file)
+    streamed = StreamedCatalog(data_file, [12, -4])
+    assert streamed.content.shape == (303, 2)
+    assert streamed.column(-4)[:2] == (-4, 'B')
+    assert (streamed.column(-4)[-1] == catalog.column(-4)[-1]).all()
+    with pytest.raises(ValueError):
+        streamed.column(6)
+    for rows, streamed_rows in zip(catalog.rows([0, 7, 302]),
+                                   streamed.rows([0, 7, 302])):
+        assert (rows == streamed_rows).all()
+    assert len(streamed.rows([])[0]) == 0
+
+
+def test_tailed_catalog(data_file, tmp_path):
+    lines = open(data_file, 'rb').read().splitlines(keepends=True)
+    tailed_file = tmp_path / "tailed.db"
+    tailed_file.write_bytes(b"".join(lines[:11]) + lines[11][:20])
+    catalog = TailedCatalog(str(tailed_file), [12, -4])
+    assert len(catalog) == 10
+    column = catalog.column(12)[-1]
+    assert catalog.extend() == 0
+    with open(tailed_file, 'ab') as file_descriptor:
+        file_descriptor.write(b"".join([lines[11][20:]] + lines[12:]))
+    assert catalog.extend() == 293
+    assert catalog.extend() == 0
+    full_catalog = Catalog(data_file)
+    assert (catalog.numbers == full_catalog.numbers).all()
+    assert (catalog.column(-4)[-1] == full_catalog.column(-4)[-1]).all()
+    assert (catalog.column(12)[-1][:10] == column).all()
+    assert (catalog.rows([302])[1] == full_catalog.rows([302])[1]).all()
+    end = catalog.end
+    with open(tailed_file, 'ab') as file_descriptor:
+        file_descriptor.write(b"\n# note\n")
+    assert catalog.extend() == 0
+    assert catalog.end == end + 8
+    assert len(catalog) == 303
+
+
+def test_filtered_catalog(data_file, group_file):
+    catalog = Catalog(data_file)
+    filtered = open_catalog(data_file, [[12, -10]], 'float32',
+                            where="`B-V` > 0.5 and V < 17")
+    expected = np.flatnonzero((catalog.column(12)[-1] > 0.5)
+                              & (catalog.column(6)[-1] < 17))
+    assert (filtered.indexes == expected).all()
+    assert (filtered.numbers == catalog.numbers[expected]).all()
+    assert (filtered.column(-10)[-1]
+            == catalog.column(-10)[-1][expected].astype(np.float32)).all()
+    assert (filtered.rows([1])[1] == catalog.rows(expected[[1]])[1]).all()
+    group_indexes = get_group_data(filtered, [[group_file, 'red']])[0][0]
+    all_indexes = get_group_data(catalog, [[group_file, 'red']])[0][0]
+    assert (np.sort(expected[group_indexes])
+            == np.intersect1d(all_indexes, expected)).all()
+
+
+def test_filtered_catalog_unknown_ids(data_file, tmp_path, capsys):
+    group_file = tmp_path / "group.num"
+    group_file.write_text("6\n1\n6408\n2\n")
+    filtered = FilteredCatalog(Catalog(data_file), "V > 14")
+    indexes = get_group_data(filtered, [[str(group_file), 'red']])[0][0]
+    assert filtered.numbers[indexes].tolist() == [6408]
+    assert capsys.readouterr().out == (
+        "2 ID(s) from file {} don't exist in the data file: 1, 2\n".format(
+            group_file))
+
+
+def test_filtered_tailed_catalog(data_file, tmp_path):
+    lines = open(data_file, 'rb').read().splitlines(keepends=True)
+    tailed_file = tmp_path / "tailed.db"
+    tailed_file.write_bytes(b"".join(lines[:101]))
+    catalog = open_catalog(str(tailed_file), [[12, -10]], tail=True,
+                           where="V < 16")
+    known = len(catalog)
+    column = catalog.column(-10)
+    tailed_file.write_bytes(b"".join(lines[:201]))
+    assert catalog.extend() == len(catalog) - known
+    capacity = len(catalog._storage[0])
+    tailed_file.write_bytes(b"".join(lines))
+    catalog.extend()
+    full_catalog = FilteredCatalog(Catalog(data_file), "V < 16")
+    assert (catalog.numbers == full_catalog.numbers).all()
+    assert (catalog.indexes == full_catalog.indexes).all()
+    assert (catalog.column(-10)[-1] == full_catalog.column(-10)[-1]).all()
+    assert catalog.column(-10)[1] == column[1]
+    assert len(catalog._storage[0]) in (capacity, 2 * capacity)
+
+
+@pytest.mark.parametrize("expression,rows", [
+    ("V < 16", lambda columns: columns['V'] < 16),
+    ("1 < V <= 16", lambda columns: (columns['V'] > 1)
+     & (columns['V'] <= 16)),
+    ("not (`B-V` > 1 or errV > 0.01)", lambda columns: ~(
+        (columns['B-V'] > 1) | (columns['errV'] > 0.01))),
+    ("(abs(`U-B`) < 1) & ~isnan(I)", lambda columns: (
+        np.abs(columns['U-B']) < 1) & ~np.isnan(columns['I'])),
+    ("2 * V - 1 >= 30", lambda columns: 2 * columns['V'] - 1 >= 30),
+    ("1 < 2", lambda columns: np.ones(303, dtype=bool)),
+    ("errV < 10**-2", lambda columns: columns['errV'] < 0.01),
+    ("V < 2**63", lambda columns: np.ones(303, dtype=bool)),
+    ("V < 10**100", lambda columns: np.ones(303, dtype=bool)),
+])
+def test_evaluate_where(data_file, expression, rows):
+    catalog = Catalog(data_file)
+    columns = {label: catalog.column(index + 1)[-1]
+               for index, label in enumerate(catalog.header)}
+    assert (evaluate_where(expression, catalog) == rows(columns)).all()
+
+
+@pytest.mark.parametrize("expression", [
+    "V <", "`U-X` > 1", "X > 1", "__import__('os')", "V.real > 1",
+    "V + 1", "'V' < 1", "[V][0] > 1", "sum(V) > 1", "abs(V, key=1) > 1",
+    "sqrt(V, V) > 0", "abs() > 1", "V < 18 & errV < 0.02", "~V > 1",
+    "(V < 16) | 1",
+])
+def test_parse_where_rejected(data_header, expression):
+    with pytest.raises(ValueError):
+        parse_where(expression, data_header)
+
+
+def test_feedback(data_file, capsys):
+    feedback(Catalog(data_file), np.array([302]))
+    output = capsys.readouterr().out.split()
+    assert output[:4] == ['#', 'object', '1', '6408']
+    assert len(output) == 4 + 14
+
+
+def test_get_catalog(data_file):
+    catalog = Catalog(data_file)
+    assert get_catalog(catalog) is catalog
+    assert len(get_catalog(data_file)) == len(catalog)
+
+
 def test_read_group_file(group_file):
     content = read_group_file(group_file)
     numbers = (
@@ -77,6 +296,12 @@ def test_read_group_file(group_file):
     assert content == numbers
 
 
+def test_read_group_numbers(group_file):
+    numbers = read_group_numbers(group_file)
+    assert numbers.dtype == np.int64
+    assert tuple(numbers.tolist()) == read_group_file(group_file)
+
+
 @pytest.mark.parametrize("nested_list, list_result", [
     ([[1, -3], [5, 6], [-4, 5]], [1, -3, 5, 6, -4]),
     ([[-5, 5, 1], [-1, 1, 6]], [-5, 5, 1, -1, 6]),
@@ -97,6 +322,13 @@ def test_get_necessary_data_column(mock_data, data_header):
     assert (array == values).all()
 
 
+def test_get_necessary_data_column_view(mock_data, data_header):
+    content = np.asfortranarray(mock_data.content)
+    values = get_necessary_data_column(content, data_header, -3)[-1]
+    assert type(values) is np.ndarray
+    assert np.shares_memory(values, content)
+
+
 @pytest.mark.parametrize("columns, results", [
     ([[4, -3]], np.ma.array([17.2035, 17.2442, 17.1444, 17.1882, 16.7973])),
     ([[2, 3]], np.ma.array([17.5104, 17.4642, 17.8264, 17.3051, 16.1958])),
@@ -107,6 +339,12 @@ def test_get_data(data_file, columns, results):
     assert (values == results).all()
 
 
+def test_get_data_catalog(data_file):
+    catalog = Catalog(data_file)
+    values = get_data(catalog, [[4, -3]])[0][-1]
+    assert (values == get_data(data_file, [[4, -3]])[0][-1]).all()
+
+
 @pytest.mark.parametrize("columns, indexes", [
     ([12, -4], (0, 1)),
     ([12, -10], (0, 2))
@@ -144,6 +382,18 @@ def test_get_marked_points(mock_get_data, columns, marked_data, results):
     assert Counter(values) == Counter(results)
 
 
+def test_mark_points(mock_get_data):
+    data = mock_get_data.content
+    indexes = np.array([5, 0, 17])
+    values = mark_points(data, indexes)
+    assert len(values) == len(data)
+    for marked, single_data in zip(values, data):
+        assert isinstance(marked, np.ndarray)
+        assert (marked == single_data[-1][indexes]).all()
+    assert mark_points(data, ()) == ()
+    assert mark_points(data, np.empty(0, dtype=int)) == ()
+
+
 def test_get_points_numbers(data_file):
     row = (3890, 3935, 3946, 3947, 4156, 4363, 4425, 4515, 4809, 6408)
     values = get_points_numbers(data_file)[-10:]
@@ -158,6 +408,20 @@ def test_get_single_group_data_number(mock_data):
     assert Counter(values) == Counter(row)
 
 
+def test_find_ids():
+    id_index = build_id_index((40, 10, 2**60, 30, 10))
+    positions = find_ids(id_index, np.array([10, 2**60, 11, 40, 50]))
+    assert positions.tolist() == [1, 2, -1, 0, -1]
+
+
+def test_get_single_group_data_unknown(mock_data, tmp_path, capsys):
+    filename = tmp_path / "group.num"
+    filename.write_text("10\n5\n12\n7\n")
+    values = get_single_group_data(mock_data.numbers, str(filename), "g")[0]
+    assert values.tolist() == [1, 2]
+    assert "2 ID(s)" in capsys.readouterr().out
+
+
 def test_get_single_group_data_color(mock_data):
     color_name = "green"
     color = get_single_group_data(
@@ -197,3 +461,124 @@ def test_get_color_data_color(mock_get_data, data_file):
         data_file, [["example_data/best.num", "green"]], mock_get_data.content)
     color = color[0][-1]
     assert color == "green"
+
+
+def test_get_color_data_groups(mock_get_data, data_file):
+    groups = [["example_data/best.num", "y"], ["example_data/better.num", "g"]]
+    colors = get_color_data(data_file, groups, mock_get_data.content)
+    for group, single_group in zip(colors, groups):
+        values = get_color_data(data_file, [single_group],
+                                mock_get_data.content)[0]
+        assert group[-1] == values[-1]
+        for column, single_column in zip(group[:-1], values[:-1]):
+            assert (column == single_column).all()
+
+
+def test_extend_color_data(data_file, tmp_path):
+    lines = open(data_file, 'rb').read().splitlines(keepends=True)
+    tailed_file = tmp_path / "tailed.db"
+    tailed_file.write_bytes(b"".join(lines[:101]))
+    groups = [["example_data/best.num", "y"], ["example_data/better.num", "g"]]
+    catalog = TailedCatalog(str(tailed_file), [12, -4])
+    colors = get_color_data(catalog, groups, get_data(catalog, [[12, -4]]))
+    tailed_file.write_bytes(b"".join(lines))
+    start = len(catalog)
+    catalog.extend()
+    data = get_data(catalog, [[12, -4]])
+    groups_numbers = tuple(np.sort(read_group_numbers(group[0]))
+                           for group in groups)
+    colors = extend_color_data(colors, groups_numbers, catalog, data, start)
+    for group, full_group in zip(colors, get_color_data(data_file, groups,
+                                                        data)):
+        assert group[-1] == full_group[-1]
+        for column, full_column in zip(group[:-1], full_group[:-1]):
+            assert (np.sort(column) == np.sort(full_column)).all()
+
+
+def test_points_in_rectangle():
+    x = np.array([0.0, 1.0, 2.0, np.nan, 1.5])
+    y = np.array([0.0, 1.0, 2.0, 1.0, np.nan])
+    assert (points_in_rectangle(x, y, (2.0, 0.5), (0.0, 2.0)) == [1, 2]).all()
+
+
+def test_points_in_polygon():
+    from matplotlib.path import Path
+    generator = np.random.default_rng(0)
+    x = generator.uniform(-1.0, 1.0, 5000)
+    y = generator.uniform(-1.0, 1.0, 5000)
+    x[3] = np.nan
+    vertices = [(0.0, 0.9), (0.8, -0.5), (0.0, 0.0), (-0.8, -0.5)]
+    expected = np.flatnonzero(Path(vertices).contains_points(
+        np.column_stack((x, y))))
+    assert len(expected) > 0
+    assert (points_in_polygon(x, y, vertices) == expected).all()
+    assert len(points_in_polygon(x, y, vertices[:2])) == 0
+
+
+def test_view_sampler():
+    generator = np.random.default_rng(0)
+    x = generator.normal(0.0, 1.0, 20000)
+    y = generator.normal(0.0, 2.0, 20000)
+    x[5] = np.nan
+    sampler = ViewSampler(x, y)
+    x_range, y_range = (1.5, -1.0), (-2.0, 3.0)
+    expected = np.flatnonzero((x >= -1.0) & (x <= 1.5)
+                              & (y >= -2.0) & (y <= 3.0))
+    assert (np.sort(sampler.inside(x_range, y_range)) == expected).all()
+    assert (np.sort(sampler.sample(x_range, y_range, 20000)) == expected).all()
+
+    sample = sampler.sample(x_range, y_range, 1000, strata=8)
+    assert np.isin(sample, expected).all()
+    assert len(np.unique(sample)) == len(sample)
+    assert abs(len(sample) - 1000) < 100
+    cells = points_density(x[expected], y[expected], x_range, y_range, (8, 8))
+    chosen = points_density(x[sample], y[sample], x_range, y_range, (8, 8))
+    assert ((chosen > 0) == (cells > 0)).all()
+    assert (sampler.sample(x_range, y_range, 1000, strata=8) == sample).all()
+
+
+def test_view_sampler_extend():
+    generator = np.random.default_rng(0)
+    x = np.round(generator.normal(0.0, 1.0, 3000), 1)
+    y = generator.normal(0.0, 1.0, 3000)
+    y[[5, 2900]] = np.nan
+    sampler = ViewSampler(x[:2000], y[:2000])
+    sampler.extend(x, y)
+    expected = ViewSampler(x, y)
+    for values, expected_values in zip(sampler.sorted, expected.sorted):
+        assert np.array_equal(values, expected_values, equal_nan=True)
+    assert (np.sort(sampler.inside((-1.0, 1.0), (0.5, -0.5)))
+            == np.sort(expected.inside((-1.0, 1.0), (0.5, -0.5)))).all()
+    assert len(sampler.priority) == 3000
+
+
+def test_points_grid():
+    generator = np.random.default_rng(0)
+    x = generator.uniform(0.0, 100.0, 2000)
+    y = generator.uniform(0.0, 80.0, 2000)
+    x[7] = np.nan
+    grid = PointsGrid(x, y, 3.0)
+    for px, py, radius in ((50.0, 40.0, 3.0), (0.0, 0.0, 8.0),
+                           (-20.0, 5.0, 4.0), (99.0, 79.0, 2.5)):
+        expected = np.flatnonzero(np.hypot(x - px, y - py) <= radius)
+        assert (grid.near(px, py, radius) == expected).all()
+
+
+def test_points_density():
+    generator = np.random.default_rng(0)
+    x = generator.normal(0.0, 1.0, 5000)
+    y = generator.normal(0.0, 2.0, 5000)
+    x[3] = np.nan
+    counts = points_density(x, y, (2.0, -2.0), (-3.0, 5.0), (40, 30))
+    finite = np.isfinite(x)
+    histogram = np.histogram2d(y[finite], x[finite], bins=(30, 40),
+                               range=((-3.0, 5.0), (-2.0, 2.0)))[0]
+    assert counts.shape == (30, 40)
+    assert (counts == histogram).all()
+
+
+def test_points_density_edges():
+    x = np.array([0.0, 0.5, 1.0, 1.0])
+    y = np.array([0.0, 0.5, 1.0, 1.5])
+    counts = points_density(x, y, (0.0, 1.0), (0.0, 1.0), (2, 2))
+    assert counts.tolist() == [[1, 0], [0, 2]]
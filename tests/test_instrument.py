@@ -0,0 +1,63 @@
+"""
+Test package of the idgrms.instrument module
+"""
+import json
+import numpy as np
+import pytest
+import idgrms.cache
+from idgrms import instrument
+from idgrms.instrument import *
+from idgrms.data import Catalog, FilteredCatalog
+
+
+@pytest.fixture
+def records_file(tmp_path):
+    filename = str(tmp_path / "profile.jsonl")
+    enable(filename)
+    yield filename
+    enable(None)
+
+
+def read_records(filename):
+    with open(filename) as file_descriptor:
+        return [json.loads(line) for line in file_descriptor]
+
+
+def test_stage_disabled(tmp_path):
+    enable(None)
+    with stage("nothing") as record:
+        record["points"] = 1
+    assert instrument.output is None
+
+
+def test_stage_nested(records_file):
+    with stage("outer") as record:
+        values = np.ones(2**20)
+        del values
+        with stage("inner") as inner_record:
+            inner_record["points"] = 7
+        record["points"] = 3
+    inner, outer = read_records(records_file)
+    assert (inner["stage"], inner["points"]) == ("inner", 7)
+    assert (outer["stage"], outer["points"]) == ("outer", 3)
+    assert outer["seconds"] >= inner["seconds"] >= 0.0
+    assert outer["peak_mb"] >= 8.0
+
+
+def test_stage_stderr(capsys):
+    enable('1')
+    with stage("printed") as record:
+        record["points"] = 5
+    enable(None)
+    assert "idgrms: printed" in capsys.readouterr().err
+
+
+def test_stage_read_file(records_file, monkeypatch):
+    monkeypatch.setattr(idgrms.cache, "use_sidecars", False)
+    catalog = FilteredCatalog(Catalog('example_data/mags.db'), "V < 16")
+    assert len(catalog) > 0
+    records = read_records(records_file)
+    assert [record["stage"] for record in records] == ["read_file",
+                                                       "evaluate_where"]
+    assert records[0]["rows"] == 303
+    assert records[1]["rows"] == len(catalog)
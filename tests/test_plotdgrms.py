@@ -0,0 +1,155 @@
+"""
+Test package of the idgrms.plotdgrms module
+"""
+import os
+import json
+import shutil
+from collections import Counter
+import pytest
+import numpy as np
+from matplotlib import pyplot as plt
+from matplotlib.backend_bases import MouseEvent, TimerBase
+from matplotlib.widgets import RectangleSelector
+import idgrms.cache
+from idgrms import plotdgrms, instrument
+
+
+class ManualTimer(TimerBase):
+    # A timer which fires only when it's told to.
+    def _timer_start(self):
+        pass
+
+    def _timer_stop(self):
+        pass
+
+
+@pytest.fixture
+def figures(request, tmp_path, monkeypatch):
+    filename = str(tmp_path / "mags.db")
+    shutil.copy('example_data/mags.db', filename)
+    plt.switch_backend('Agg')
+    monkeypatch.setattr(plt, "show", lambda: None)
+    monkeypatch.setattr(idgrms.cache, "use_sidecars", False)
+    monkeypatch.setattr(plotdgrms, "redraw_timer", None)
+    monkeypatch.setattr(plotdgrms, "dirty_figures", [])
+    monkeypatch.setattr(plotdgrms, "image_number", 0)
+    monkeypatch.setattr(plotdgrms, "marked_data_indexes",
+                        np.empty(0, dtype=int))
+    plt.close('all')
+    grid = getattr(request, "param", False)
+    plotdgrms.trigger_windows(filename, [[12, -10], [12, -4], [10, 6]], None,
+                              False, grid_argument=grid)
+    figures = tuple(plt.figure(number) for number in plt.get_fignums())
+    for figure in figures:
+        figure.canvas.draw()
+    yield filename, figures
+    plt.close('all')
+
+
+def press(figure, x, y, names=('button_press_event',)):
+    for name in names:
+        figure.canvas.callbacks.process(
+            name, MouseEvent(name, figure.canvas, x, y, 1))
+
+
+def click(figure, index):
+    ax = figure.axes[0]
+    x, y = ax.transData.transform(
+        [ax.points_data[0][index], ax.points_data[1][index]])
+    press(figure, x, y)
+
+
+def click_button(button):
+    x, y = button.ax.transAxes.transform((0.5, 0.5))
+    press(button.ax.figure, x, y,
+          ('button_press_event', 'button_release_event'))
+
+
+def test_schedule_redraw(figures, monkeypatch):
+    timers = []
+    redrawn = Counter()
+
+    def new_timer(*args, **kwargs):
+        timers.append(ManualTimer(*args, **kwargs))
+        return timers[-1]
+
+    for figure in figures[1]:
+        monkeypatch.setattr(figure.canvas, "new_timer", new_timer)
+    monkeypatch.setattr(plotdgrms, "redraw_marked_points",
+                        lambda figure: redrawn.update([figure]))
+
+    for index in (0, 7, 302):
+        click(figures[1][index % 2], index)
+    assert len(timers) == 1
+    assert not redrawn
+
+    timers[0]._on_timer()
+    assert redrawn == Counter(figures[1])
+    assert plotdgrms.redraw_timer is None
+    assert plotdgrms.dirty_figures == []
+
+
+def test_stage_points(figures, tmp_path):
+    records_file = str(tmp_path / "profile.jsonl")
+    instrument.enable(records_file)
+    try:
+        click(figures[1][0], 302)
+    finally:
+        instrument.enable(None)
+    with open(records_file) as file_descriptor:
+        records = [json.loads(line) for line in file_descriptor]
+    assert [record["stage"] for record in records][-2:] == [
+        "update_marked_points", "pick_point"]
+    assert records[-2]["points"] == 3
+    assert records[-1]["points"] == plotdgrms.drawn_points(figures[1])
+
+
+def test_save_snapshot(figures):
+    filename, figures = figures
+    click(figures[0], 302)
+    images = plotdgrms.save_snapshot(filename, figures).result()
+    assert images == (filename + "_U-B_B-V_1.png", filename + "_B_B-V_1.png",
+                      filename + "_V_U-B_1.png")
+    assert all(os.path.getsize(image) > 0 for image in images)
+    assert figures[0].axes[0].save_button.label.get_text() == 'Saved'
+    marked_layer = plotdgrms.copy_diagram(filename, figures[0])[-1][-1]
+    assert len(marked_layer[1]) == 1
+
+
+def test_save_snapshot_vector(figures):
+    filename, figures = figures
+    images = plotdgrms.save_snapshot(filename, figures[:1], 'svg',
+                                     50).result()
+    assert images == (filename + "_U-B_B-V_1.svg",)
+    with open(images[0]) as image:
+        assert "<image" in image.read()
+    assert plotdgrms.image_format == 'png'
+    assert plotdgrms.raster_dpi == 150
+
+
+@pytest.mark.parametrize("figures", [True], indirect=True)
+def test_grid_figures(figures):
+    filename, windows = figures
+    assert len(windows) == 1
+    panels = windows[0].diagrams
+    assert len(panels) == 3
+    assert all(panel.canvas is windows[0].canvas for panel in panels)
+
+    click(panels[1], 302)
+    assert all(len(panel.axes[0].marked_layer.get_offsets()) == 1
+               for panel in panels)
+
+    ax = panels[2].axes[0]
+    for _ in range(2):
+        click_button(ax.select_button)
+    assert ax.selection_mode == 'Box'
+    assert isinstance(ax.selector, RectangleSelector)
+    (x0, y0), (x1, y1) = ax.transAxes.transform([(0.0, 0.0), (1.0, 1.0)])
+    press(panels[2], x0 + 1, y0 + 1)
+    press(panels[2], x1 - 1, y1 - 1,
+          ('motion_notify_event', 'button_release_event'))
+    windows[0].canvas.draw()
+    marked_number = len(plotdgrms.marked_data_indexes)
+    assert marked_number > 1
+    assert all(len(panel.axes[0].marked_layer.get_offsets()) == marked_number
+               for panel in panels)